@@ -2,63 +2,153 @@
 Generate response node - Uses GPT-4o to create answers
 """
 from promptflow.core import tool
-from openai import AzureOpenAI
+from openai import AzureOpenAI, AsyncAzureOpenAI
 import os
+import sys
+from functools import lru_cache
 from pathlib import Path
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-env_path = Path(__file__).parent.parent.parent / '.env'
-load_dotenv(dotenv_path=env_path)
+# Shared helpers live in prompt_flows/utils (copied next to the flow via additional_includes)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.config import (
+    AZURE_DEPLOYMENT_NAME,
+    AZURE_OPENAI_API_KEY,
+    AZURE_OPENAI_API_VERSION,
+    AZURE_OPENAI_ENDPOINT,
+)
+from utils.http_client import async_http_client, per_event_loop
+from utils.llm_cache import cached_completion, lookup_completion, store_completion
+from utils.rate_limiter import RateLimiter, estimate_tokens
+from utils.retry import retry_transient
+
+# Shared throttle for concurrent callers, sized to the deployment's quota
+_RATE_LIMITER = RateLimiter(
+    requests_per_minute=float(os.getenv('AZURE_OPENAI_RPM', '300')),
+    tokens_per_minute=float(os.getenv('AZURE_OPENAI_TPM', '50000'))
+)
+
+# Sampling temperature; at 0 responses are deterministic and served from the disk cache
+TEMPERATURE = float(os.getenv('TEMPERATURE', '0.7'))
+
+
+# Clients are built once per process (async ones once per event loop) so HTTP connections
+# and TLS sessions are reused
+@lru_cache(maxsize=1)
+def _client() -> AzureOpenAI:
+    return AzureOpenAI(
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        api_key=AZURE_OPENAI_API_KEY,
+        api_version=AZURE_OPENAI_API_VERSION
+    )
+
+
+@per_event_loop
+def _async_client() -> AsyncAzureOpenAI:
+    return AsyncAzureOpenAI(
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        api_key=AZURE_OPENAI_API_KEY,
+        api_version=AZURE_OPENAI_API_VERSION,
+        http_client=async_http_client(),
+        max_retries=0  # Retries are handled by retry_transient with jittered backoff
+    )
+
+
+# Static instructions go first and are never interpolated, so Azure OpenAI's automatic
+# prompt caching can reuse this prefix across requests; per-request text follows it
+SYSTEM_INSTRUCTIONS = """You are an AI assistant for Outlander Gear Co., a company that sells high-quality outdoor equipment.
+Your role is to help customers find product information, compare products, and answer questions about pricing, features, warranties, and specifications.
+
+Be helpful, friendly, and accurate. Base your responses ONLY on the product information provided in the context below.
+If you don't know the answer or the information isn't in the context, say so politely."""
+
+# Per-request context message that follows the static instructions
+CONTEXT_MESSAGE_TEMPLATE = "Context from product catalog:\n{context}"
+
+
+def _build_messages(question: str, context: str, chat_history: list = None) -> list:
+    """Build the chat messages sent to GPT-4o for a question and its context."""
+    # Static instructions first, then the retrieved context in its own system message
+    messages = [
+        {"role": "system", "content": SYSTEM_INSTRUCTIONS},
+        {"role": "system", "content": CONTEXT_MESSAGE_TEMPLATE.format(context=context)}
+    ]
+
+    # Add chat history if provided
+    if chat_history:
+        for msg in chat_history:
+            messages.append(msg)
+
+    # Add current question
+    messages.append({"role": "user", "content": question})
+
+    return messages
+
+
+def build_request(question: str, context: str, chat_history: list = None) -> dict:
+    """Build the chat completion request body, shared by the sync, async and Batch API paths."""
+    return {
+        "model": AZURE_DEPLOYMENT_NAME,
+        "messages": _build_messages(question, context, chat_history),
+        "temperature": TEMPERATURE,
+        "max_tokens": 500
+    }
 
 
 @tool
 def generate_response(question: str, context: str, chat_history: list = None) -> str:
     """
     Generate a helpful answer using GPT-4o based on the retrieved context.
-    
+
     Args:
         question: User's question
         context: Retrieved product information from search
         chat_history: Previous conversation messages (optional)
-    
+
     Returns:
         Generated answer
     """
-    # Initialize Azure OpenAI client
-    client = AzureOpenAI(
-        azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
-        api_key=os.getenv('AZURE_OPENAI_API_KEY'),
-        api_version=os.getenv('AZURE_OPENAI_API_VERSION')
-    )
-    
-    # Build system message with context
-    system_message = f"""You are an AI assistant for Outlander Gear Co., a company that sells high-quality outdoor equipment.
-Your role is to help customers find product information, compare products, and answer questions about pricing, features, warranties, and specifications.
+    request = build_request(question, context, chat_history)
 
-Be helpful, friendly, and accurate. Base your responses ONLY on the product information provided in the context below.
-If you don't know the answer or the information isn't in the context, say so politely.
-
-Context from product catalog:
-{context}"""
-    
-    # Build messages
-    messages = [{"role": "system", "content": system_message}]
-    
-    # Add chat history if provided
-    if chat_history:
-        for msg in chat_history:
-            messages.append(msg)
-    
-    # Add current question
-    messages.append({"role": "user", "content": question})
-    
     # Generate response
-    response = client.chat.completions.create(
-        model=os.getenv('AZURE_DEPLOYMENT_NAME'),
-        messages=messages,
-        temperature=0.7,
-        max_tokens=500
-    )
-    
+    if TEMPERATURE == 0:
+        return cached_completion(_client(), **request)
+
+    response = _client().chat.completions.create(**request)
     return response.choices[0].message.content
+
+
+@retry_transient
+async def _create_completion_async(request: dict) -> str:
+    """Send one chat request, retrying rate limits and transient errors with jittered backoff."""
+    # Wait for request and token quota instead of pausing blindly; each retry re-acquires it
+    await _RATE_LIMITER.acquire(estimate_tokens(request["messages"], request["max_tokens"]))
+
+    response = await _async_client().chat.completions.create(**request)
+    return response.choices[0].message.content
+
+
+async def generate_response_async(question: str, context: str, chat_history: list = None) -> str:
+    """
+    Async variant of generate_response for concurrent batch runs.
+
+    Args:
+        question: User's question
+        context: Retrieved product information from search
+        chat_history: Previous conversation messages (optional)
+
+    Returns:
+        Generated answer
+    """
+    request = build_request(question, context, chat_history)
+
+    if TEMPERATURE == 0:
+        cached = lookup_completion(**request)
+        if cached is not None:
+            return cached
+
+    answer = await _create_completion_async(request)
+
+    if TEMPERATURE == 0:
+        store_completion(answer, **request)
+
+    return answer
@@ -2,19 +2,102 @@
 Run batch evaluation on the test dataset using the local Prompt Flow
 """
 
-import json
+import asyncio
+import orjson
+import os
 from pathlib import Path
 from datetime import datetime
 import sys
 
-# Add parent directory to path
+# Add parent directory to path; shared helpers are imported as utils.*, the same module
+# path the flow nodes use, so each helper module is loaded once per process
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from test_flow import test_flow
+from prompt_flows.outlander_copilot.generate_response import build_request
+from prompt_flows.outlander_copilot.search_products import search_products_batch
+from utils.batch_api import run_chat_batch
+from test_flow import test_flow_async
 
+# Maximum number of test cases in flight at once; size to the Azure OpenAI TPM quota
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "8"))
 
-def run_batch_evaluation():
-    """Run evaluation on all test questions"""
+# Datasets at least this large go through the Azure OpenAI Batch API (50% cost, 24h window)
+BATCH_API_MIN_CASES = int(os.getenv("BATCH_API_MIN_CASES", "200"))
+
+
+def write_result(f, record: dict):
+    """Append one result record as a JSONL line and flush it, so finished cases survive a crash"""
+    f.write(orjson.dumps(record) + b"\n")
+    f.flush()
+
+
+def _error_result(i: int, test_case: dict, error) -> dict:
+    """Build the result record for a test case that raised"""
+    return {
+        "test_number": i,
+        "question": test_case['chat_input'],
+        "expected_answer": test_case['truth'],
+        "actual_answer": f"ERROR: {str(error)}",
+        "context_retrieved": "",
+        "status": "error"
+    }
+
+
+async def run_test_case(i: int, test_case: dict, context: str, total: int,
+                        semaphore: asyncio.Semaphore) -> dict:
+    """Run a single test case through the flow, bounded by the shared semaphore"""
+    question = test_case['chat_input']
+    expected = test_case['truth']
+    
+    async with semaphore:
+        print(f"\n▶️  TEST {i}/{total}: {question}")
+        try:
+            result = await test_flow_async(question, context=context)
+            return {
+                "test_number": i,
+                "question": question,
+                "expected_answer": expected,
+                "actual_answer": result["answer"],
+                "context_retrieved": result["context"],
+                "status": "success"
+            }
+        except Exception as e:
+            print(f"\n❌ Error in test {i}: {str(e)}")
+            return _error_result(i, test_case, e)
+
+
+def run_with_batch_api(test_cases: list, contexts: list, batch_file: Path) -> list:
+    """Generate every answer in a single Azure OpenAI Batch API job"""
+    batch_deployment = os.getenv("AZURE_BATCH_DEPLOYMENT_NAME", os.getenv("AZURE_DEPLOYMENT_NAME"))
+    
+    requests = {}
+    for i, (test_case, context) in enumerate(zip(test_cases, contexts), 1):
+        request = build_request(test_case['chat_input'], context, test_case.get('chat_history'))
+        request["model"] = batch_deployment
+        requests[f"t-{i}"] = request
+    
+    outputs = run_chat_batch(requests, batch_file)
+    
+    results = []
+    for i, (test_case, context) in enumerate(zip(test_cases, contexts), 1):
+        output = outputs[f"t-{i}"]
+        if output["error"] is not None:
+            results.append(_error_result(i, test_case, output["error"]))
+            continue
+        results.append({
+            "test_number": i,
+            "question": test_case['chat_input'],
+            "expected_answer": test_case['truth'],
+            "actual_answer": output["content"],
+            "context_retrieved": context,
+            "status": "success"
+        })
+    return results
+
+
+async def run_batch_evaluation_async():
+    """Run evaluation on all test questions concurrently"""
     
     print("\n" + "="*80)
     print("OUTLANDER GEAR CO. - BATCH EVALUATION")
@@ -26,62 +109,57 @@ def run_batch_evaluation():
     print(f"\nLoading test dataset: {eval_file}")
     
     test_cases = []
-    with open(eval_file, 'r', encoding='utf-8') as f:
+    with open(eval_file, 'rb') as f:
         for line in f:
-            test_cases.append(json.loads(line))
+            test_cases.append(orjson.loads(line))
     
     print(f"Found {len(test_cases)} test questions")
     
-    # Run evaluation
-    results = []
+    results_dir = Path(__file__).parent.parent.parent / "evaluation" / "results"
+    results_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    # Retrieve context for every question up front, embedding the queries in batches
+    print("\n🔍 Searching products for all questions...")
+    contexts = await search_products_batch([test_case['chat_input'] for test_case in test_cases])
+    
+    # Results are streamed one JSON line per case as they finish; only the counters
+    # and a few samples are kept in memory
+    results_file = results_dir / f"promptflow_evaluation_{timestamp}.jsonl"
+    summary_file = results_dir / f"promptflow_evaluation_{timestamp}_summary.json"
     successful = 0
     failed = 0
+    samples = []
     
-    for i, test_case in enumerate(test_cases, 1):
-        question = test_case['chat_input']
-        expected = test_case['truth']
-        
-        print(f"\n\n{'='*80}")
-        print(f"TEST {i}/{len(test_cases)}")
-        print(f"{'='*80}")
-        
-        try:
-            result = test_flow(question)
-            
-            results.append({
-                "test_number": i,
-                "question": question,
-                "expected_answer": expected,
-                "actual_answer": result["answer"],
-                "context_retrieved": result["context"],
-                "status": "success"
-            })
+    def record(result: dict):
+        nonlocal successful, failed
+        write_result(f, result)
+        if result["status"] == "success":
             successful += 1
-            
-        except Exception as e:
-            print(f"\n❌ Error: {str(e)}")
-            results.append({
-                "test_number": i,
-                "question": question,
-                "expected_answer": expected,
-                "actual_answer": f"ERROR: {str(e)}",
-                "context_retrieved": "",
-                "status": "error"
-            })
+        else:
             failed += 1
-        
-        # Pause between questions to avoid rate limiting
-        if i < len(test_cases):
-            print("\n⏸️  Pausing 2 seconds before next question...")
-            import time
-            time.sleep(2)
-    
-    # Save results
-    results_dir = Path(__file__).parent.parent.parent / "evaluation" / "results"
-    results_dir.mkdir(parents=True, exist_ok=True)
+        if len(samples) < 3:
+            samples.append(result)
     
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    results_file = results_dir / f"promptflow_evaluation_{timestamp}.json"
+    with open(results_file, 'ab') as f:
+        if len(test_cases) >= BATCH_API_MIN_CASES:
+            # Large offline runs: one discounted batch job instead of N live requests
+            print(f"\n📦 Submitting {len(test_cases)} questions to the Azure OpenAI Batch API")
+            batch_file = results_dir / f"evaluation_batch_{timestamp}.jsonl"
+            for result in await asyncio.to_thread(run_with_batch_api, test_cases, contexts, batch_file):
+                record(result)
+        else:
+            # Small runs: live requests; the semaphore bounds in-flight cases and the rate
+            # limiter in generate_response paces requests against the RPM/TPM quota
+            print(f"Running with up to {MAX_CONCURRENCY} concurrent requests")
+            semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+            
+            tasks = [
+                run_test_case(i, test_case, context, len(test_cases), semaphore)
+                for i, (test_case, context) in enumerate(zip(test_cases, contexts), 1)
+            ]
+            for next_result in asyncio.as_completed(tasks):
+                record(await next_result)
     
     summary = {
         "timestamp": timestamp,
@@ -89,11 +167,11 @@ def run_batch_evaluation():
         "successful": successful,
         "failed": failed,
         "success_rate": f"{(successful/len(test_cases)*100):.1f}%",
-        "results": results
+        "results_file": results_file.name
     }
     
-    with open(results_file, 'w', encoding='utf-8') as f:
-        json.dump(summary, f, indent=2)
+    with open(summary_file, 'wb') as f:
+        f.write(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
     
     # Print summary
     print("\n\n" + "="*80)
@@ -104,11 +182,12 @@ def run_batch_evaluation():
     print(f"❌ Failed: {failed}")
     print(f"📈 Success Rate: {(successful/len(test_cases)*100):.1f}%")
     print(f"\n💾 Results saved to: {results_file}")
+    print(f"💾 Summary saved to: {summary_file}")
     print("\n" + "="*80)
     
     # Show sample results
     print("\n📋 SAMPLE RESULTS:\n")
-    for i, result in enumerate(results[:3], 1):
+    for i, result in enumerate(samples, 1):
         print(f"Question {i}: {result['question']}")
         print(f"Expected: {result['expected_answer'][:80]}...")
         print(f"Actual: {result['actual_answer'][:80]}...")
@@ -118,5 +197,10 @@ def run_batch_evaluation():
     return summary
 
 
+def run_batch_evaluation():
+    """Run evaluation on all test questions"""
+    return asyncio.run(run_batch_evaluation_async())
+
+
 if __name__ == "__main__":
     run_batch_evaluation()
@@ -6,87 +6,189 @@ This retrieves relevant product information from Azure AI Search with vector emb
 from promptflow.core import tool
 from azure.core.credentials import AzureKeyCredential
 from azure.search.documents import SearchClient
-from openai import AzureOpenAI
+from azure.search.documents.aio import SearchClient as AsyncSearchClient
+from openai import AzureOpenAI, AsyncAzureOpenAI
+import asyncio
 import os
+import sys
+from functools import lru_cache
 from pathlib import Path
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-env_path = Path(__file__).parent.parent.parent / '.env'
-load_dotenv(dotenv_path=env_path)
+# Shared helpers live in prompt_flows/utils (copied next to the flow via additional_includes)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.config import (
+    AZURE_EMBEDDING_API_KEY,
+    AZURE_EMBEDDING_API_VERSION,
+    AZURE_EMBEDDING_DEPLOYMENT_NAME,
+    AZURE_EMBEDDING_ENDPOINT,
+    AZURE_SEARCH_API_KEY,
+    AZURE_SEARCH_ENDPOINT,
+    AZURE_SEARCH_INDEX_NAME,
+)
+from utils.embedding_cache import cached_embeddings, cached_embeddings_async
+from utils.http_client import async_http_client, per_event_loop
+from utils.tokens import truncate_tokens
+
+# Token budget for each product's content in the context passed to GPT-4o
+MAX_CONTENT_TOKENS = int(os.getenv('MAX_CONTENT_TOKENS', '200'))
+
+# Searches in flight at once in search_products_batch; the same setting bounds the batch runners
+MAX_CONCURRENCY = int(os.getenv('MAX_CONCURRENCY', '8'))
+
+
+# Clients are built once per process (async ones once per event loop) so HTTP connections
+# and TLS sessions are reused
+@lru_cache(maxsize=1)
+def _search_client() -> SearchClient:
+    return SearchClient(
+        endpoint=AZURE_SEARCH_ENDPOINT,
+        index_name=AZURE_SEARCH_INDEX_NAME,
+        credential=AzureKeyCredential(AZURE_SEARCH_API_KEY)
+    )
+
+
+@lru_cache(maxsize=1)
+def _embedding_client() -> AzureOpenAI:
+    return AzureOpenAI(
+        azure_endpoint=AZURE_EMBEDDING_ENDPOINT,
+        api_key=AZURE_EMBEDDING_API_KEY,
+        api_version=AZURE_EMBEDDING_API_VERSION
+    )
+
+
+@per_event_loop
+def _async_search_client() -> AsyncSearchClient:
+    return AsyncSearchClient(
+        endpoint=AZURE_SEARCH_ENDPOINT,
+        index_name=AZURE_SEARCH_INDEX_NAME,
+        credential=AzureKeyCredential(AZURE_SEARCH_API_KEY)
+    )
+
+
+@per_event_loop
+def _async_embedding_client() -> AsyncAzureOpenAI:
+    return AsyncAzureOpenAI(
+        azure_endpoint=AZURE_EMBEDDING_ENDPOINT,
+        api_key=AZURE_EMBEDDING_API_KEY,
+        api_version=AZURE_EMBEDDING_API_VERSION,
+        http_client=async_http_client()
+    )
+
+
+def _format_results(results) -> str:
+    """Format search results into the context string passed to the LLM."""
+    context = []
+    for i, result in enumerate(results, 1):
+        title = result.get("title", "Unknown Product")
+        content = truncate_tokens(result.get("content", ""), MAX_CONTENT_TOKENS)  # Limit content length
+        category = result.get("category", "")
+        price = result.get("price", "")
+
+        product_info = f"## Product {i}: {title}\n"
+        if category:
+            product_info += f"**Category:** {category}\n"
+        if price:
+            product_info += f"**Price:** {price}\n"
+        product_info += f"\n{content}\n"
+
+        context.append(product_info)
+
+    if not context:
+        return "No relevant product information found."
+
+    return "\n".join(context)
+
+
+def _search_kwargs(query: str, query_embedding: list) -> dict:
+    """Build the hybrid search (vector + keyword) arguments for a query."""
+    return {
+        "search_text": query,
+        "vector_queries": [{
+            "kind": "vector",
+            "vector": query_embedding,
+            "fields": "contentVector",
+            "k": 3
+        }],
+        "top": 3,
+        "select": ["title", "content", "category", "price"]
+    }
 
 
 @tool
 def search_products(query: str) -> str:
     """
     Search for relevant products using hybrid search (vector + keyword).
-    
+
     Args:
         query: User's question about products
-    
+
     Returns:
         Formatted string with relevant product information
     """
     try:
-        # Get configuration from environment
-        search_endpoint = os.getenv('AZURE_SEARCH_ENDPOINT')
-        search_key = os.getenv('AZURE_SEARCH_API_KEY')
-        index_name = os.getenv('AZURE_SEARCH_INDEX_NAME', 'outlander-products-index')
-        
-        # Initialize search client
-        search_client = SearchClient(
-            endpoint=search_endpoint,
-            index_name=index_name,
-            credential=AzureKeyCredential(search_key)
-        )
-        
-        # Generate embedding for the query
-        embedding_client = AzureOpenAI(
-            azure_endpoint=os.getenv('AZURE_EMBEDDING_ENDPOINT'),
-            api_key=os.getenv('AZURE_EMBEDDING_API_KEY'),
-            api_version=os.getenv('AZURE_EMBEDDING_API_VERSION')
-        )
-        
-        embedding_response = embedding_client.embeddings.create(
-            input=query,
-            model=os.getenv('AZURE_EMBEDDING_DEPLOYMENT_NAME')
-        )
-        query_embedding = embedding_response.data[0].embedding
-        
+        # Generate embedding for the query (repeated queries are served from the disk cache)
+        query_embedding = cached_embeddings(_embedding_client(), AZURE_EMBEDDING_DEPLOYMENT_NAME, [query])[0]
+
         # Perform hybrid search (vector + keyword)
-        results = search_client.search(
-            search_text=query,
-            vector_queries=[{
-                "kind": "vector",
-                "vector": query_embedding,
-                "fields": "contentVector",
-                "k": 3
-            }],
-            top=3,
-            select=["title", "content", "category", "price"]
-        )
-        
-        # Format results
-        context = []
-        for i, result in enumerate(results, 1):
-            title = result.get("title", "Unknown Product")
-            content = result.get("content", "")[:800]  # Limit content length
-            category = result.get("category", "")
-            price = result.get("price", "")
-            
-            product_info = f"## Product {i}: {title}\n"
-            if category:
-                product_info += f"**Category:** {category}\n"
-            if price:
-                product_info += f"**Price:** {price}\n"
-            product_info += f"\n{content}\n"
-            
-            context.append(product_info)
-        
-        if not context:
-            return "No relevant product information found."
-        
-        return "\n".join(context)
-        
+        results = _search_client().search(**_search_kwargs(query, query_embedding))
+
+        return _format_results(results)
+
+    except Exception as e:
+        return f"Error searching products: {str(e)}"
+
+
+async def search_products_async(query: str) -> str:
+    """
+    Async variant of search_products for concurrent batch runs.
+
+    Args:
+        query: User's question about products
+
+    Returns:
+        Formatted string with relevant product information
+    """
+    try:
+        query_embedding = (await cached_embeddings_async(
+            _async_embedding_client(), AZURE_EMBEDDING_DEPLOYMENT_NAME, [query]
+        ))[0]
+
+        results = await _async_search_client().search(**_search_kwargs(query, query_embedding))
+        return _format_results([result async for result in results])
+
     except Exception as e:
         return f"Error searching products: {str(e)}"
+
+
+async def search_products_batch(queries: list) -> list:
+    """
+    Search for several queries at once, embedding uncached queries in batched requests.
+
+    Args:
+        queries: User questions about products
+
+    Returns:
+        Formatted product information for each query, in the same order
+    """
+    try:
+        query_embeddings = await cached_embeddings_async(
+            _async_embedding_client(), AZURE_EMBEDDING_DEPLOYMENT_NAME, queries
+        )
+    except Exception as e:
+        return [f"Error searching products: {str(e)}"] * len(queries)
+
+    # Bounded, so a whole dataset of queries does not hit the search service at once
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def search(query: str, query_embedding: list) -> str:
+        async with semaphore:
+            try:
+                results = await _async_search_client().search(**_search_kwargs(query, query_embedding))
+                return _format_results([result async for result in results])
+            except Exception as e:
+                return f"Error searching products: {str(e)}"
+
+    return await asyncio.gather(*[
+        search(query, query_embedding)
+        for query, query_embedding in zip(queries, query_embeddings)
+    ])
@@ -3,61 +3,15 @@ Test the Prompt Flow locally without using pf CLI
 This simulates the flow execution for testing and screenshots
 """
 
-import os
 import sys
 from pathlib import Path
-from dotenv import load_dotenv
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-# Load environment variables
-load_dotenv(Path(__file__).parent.parent.parent / ".env")
-
-# Import the search function
-from prompt_flows.outlander_copilot.search_products import search_products
-
-# Import OpenAI for generation
-from openai import AzureOpenAI
-
-
-def generate_response(question: str, context: str, chat_history: list = None) -> str:
-    """Generate response using GPT-4o"""
-    
-    client = AzureOpenAI(
-        azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
-        api_key=os.getenv('AZURE_OPENAI_API_KEY'),
-        api_version=os.getenv('AZURE_OPENAI_API_VERSION')
-    )
-    
-    # Build the system message
-    system_message = f"""You are an AI assistant for Outlander Gear Co., a company that sells high-quality outdoor equipment.
-Your role is to help customers find product information, compare products, and answer questions about pricing, features, warranties, and specifications.
-
-Be helpful, friendly, and accurate. Base your responses ONLY on the product information provided in the context below.
-If you don't know the answer or the information isn't in the context, say so politely.
-
-Context from product catalog:
-{context}"""
-    
-    messages = [{"role": "system", "content": system_message}]
-    
-    # Add chat history if provided
-    if chat_history:
-        for msg in chat_history:
-            messages.append(msg)
-    
-    # Add current question
-    messages.append({"role": "user", "content": question})
-    
-    response = client.chat.completions.create(
-        model=os.getenv('AZURE_DEPLOYMENT_NAME'),
-        messages=messages,
-        temperature=0.7,
-        max_tokens=500
-    )
-    
-    return response.choices[0].message.content
+# Import the flow nodes (importing them loads .env via utils.config)
+from prompt_flows.outlander_copilot.search_products import search_products, search_products_async
+from prompt_flows.outlander_copilot.generate_response import generate_response, generate_response_async
 
 
 def test_flow(question: str, chat_history: list = None):
@@ -73,7 +27,7 @@ def test_flow(question: str, chat_history: list = None):
     # Step 1: Search
     print("\n🔍 Step 1: Searching products...")
     context = search_products(question)
-    print(f"\n   Retrieved {len(context.split('## Product')) - 1} products")
+    print(f"\n   Retrieved {context.count('## Product')} products")
     print(f"\n   Context preview:")
     print(f"   {context[:200]}..." if len(context) > 200 else f"   {context}")
     
@@ -96,6 +50,27 @@ def test_flow(question: str, chat_history: list = None):
     }
 
 
+async def test_flow_async(question: str, chat_history: list = None, context: str = None):
+    """Test the complete flow without blocking, for concurrent batch runs
+    
+    Pass a context already retrieved with search_products_batch to skip the search step.
+    """
+    
+    if context is None:
+        context = await search_products_async(question)
+    answer = await generate_response_async(question, context, chat_history)
+    
+    print(f"\n✅ {question}")
+    print(f"   Retrieved {context.count('## Product')} products")
+    print(f"   Answer: {answer[:200]}..." if len(answer) > 200 else f"   Answer: {answer}")
+    
+    return {
+        "question": question,
+        "context": context,
+        "answer": answer
+    }
+
+
 def run_interactive_test():
     """Run interactive testing"""
     
@@ -3,11 +3,12 @@ Aggregate evaluation results across all test cases
 """
 
 from typing import List
+import numpy as np
 from promptflow.core import tool, log_metric
 
 
 @tool
-def aggregate_results(scores: List[str]) -> dict:
+def aggregate_results(scores: List[float]) -> dict:
     """
     Aggregate scores from all evaluated questions.
     
@@ -26,20 +27,20 @@ def aggregate_results(scores: List[str]) -> dict:
             "passed_cases": 0
         }
     
-    # Convert string scores to floats
-    float_scores = [float(score) for score in scores]
+    # One contiguous float array for vectorized reductions
+    float_scores = np.asarray(scores, dtype=np.float64)
     
     # Calculate metrics
-    average_score = round(sum(float_scores) / len(float_scores), 2)
+    average_score = round(float(float_scores.mean()), 2)
     
     # Consider pass threshold as 3.5 (70%)
     pass_threshold = 3.5
-    passed_cases = sum(1 for score in float_scores if score >= pass_threshold)
+    passed_cases = int((float_scores >= pass_threshold).sum())
     pass_rate = round((passed_cases / len(float_scores)) * 100, 2)
     
     # Find min and max scores
-    min_score = round(min(float_scores), 2)
-    max_score = round(max(float_scores), 2)
+    min_score = round(float(float_scores.min()), 2)
+    max_score = round(float(float_scores.max()), 2)
     
     # Log metrics for Prompt Flow
     log_metric(key="average_score", value=average_score)
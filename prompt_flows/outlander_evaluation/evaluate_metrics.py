@@ -5,55 +5,44 @@ Evaluates: relevance, accuracy, completeness, groundedness, fluency
 
 from promptflow.core import tool
 from pathlib import Path
-from dotenv import load_dotenv
 import os
-import json
-from openai import AzureOpenAI
+import sys
+import asyncio
+from functools import lru_cache
+from openai import AzureOpenAI, AsyncAzureOpenAI
+from pydantic import BaseModel
 
-# Load environment variables
-env_path = Path(__file__).parent.parent.parent / '.env'
-load_dotenv(dotenv_path=env_path)
+# Shared helpers live in prompt_flows/utils (copied next to the flow via additional_includes)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.config import (
+    AZURE_DEPLOYMENT_NAME,
+    AZURE_OPENAI_API_KEY,
+    AZURE_OPENAI_ENDPOINT,
+    JUDGE_API_VERSION,
+)
+from utils.http_client import async_http_client, http_client, per_event_loop
+from utils.llm_cache import cached_parse, lookup_completion, store_completion
+from utils.rate_limiter import RateLimiter, estimate_tokens
+from utils.retry import retry_transient
+from utils.semantic_cache import canonicalize, get_semantic_cache
 
+# Verdict cache for reruns over the same cases (enabled with EVAL_SEMANTIC_CACHE=1)
+_SEMANTIC_CACHE = get_semantic_cache("evaluate_metrics")
 
-@tool
-def evaluate_metrics(question: str, ground_truth: str, prediction: str, context: str = "") -> dict:
-    """
-    Evaluate the quality of the copilot's answer using GPT-4o as a judge.
-    
-    Args:
-        question: User's question
-        ground_truth: Expected answer or key information
-        prediction: Generated answer from copilot
-        context: Retrieved product context (optional)
-    
-    Returns:
-        Dictionary with evaluation metrics (0-5 scale):
-        - relevance: Does it address the question?
-        - accuracy: Is information factually correct?
-        - completeness: Sufficient detail provided?
-        - groundedness: Based on context only?
-        - fluency: Well-written and clear?
-    """
-    
-    # Initialize Azure OpenAI client
-    client = AzureOpenAI(
-        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-        api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2025-01-01-preview"),
-        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-    )
-    
-    deployment_name = os.getenv("AZURE_DEPLOYMENT_NAME", "gpt-4o")
-    
-    # Build evaluation prompt
-    eval_prompt = f"""You are an expert evaluator for AI chatbot responses. Evaluate the following answer on 5 criteria using a scale of 0-5 (where 5 is excellent and 0 is poor).
+# Shared throttle for concurrent judge calls, sized to the deployment's quota
+_RATE_LIMITER = RateLimiter(
+    requests_per_minute=float(os.getenv('AZURE_OPENAI_RPM', '300')),
+    tokens_per_minute=float(os.getenv('AZURE_OPENAI_TPM', '50000'))
+)
 
-**Question:** {question}
+# Static rubric sent as the system message, so Azure OpenAI's automatic prompt caching
+# can reuse it across cases; the per-case fields follow in the user message. Caching
+# only applies to prefixes of at least 1024 tokens, which the score anchors below cross
+EVAL_SYSTEM_PROMPT = """You are an expert AI evaluator. Return only valid JSON.
 
-**Ground Truth (Expected Answer):** {ground_truth}
+You are an expert evaluator for AI chatbot responses. Evaluate the answer in the next message on 5 criteria using a scale of 0-5 (where 5 is excellent and 0 is poor).
 
-**Generated Answer:** {prediction}
-
-**Context Used:** {context if context else "No context provided"}
+The chatbot is a customer support copilot for Outlander, an outdoor gear retailer. It answers questions about products such as tents, backpacks, hiking boots, jackets, sleeping bags and camping stoves, using product information retrieved from the catalog.
 
 **Evaluation Criteria:**
 
@@ -63,62 +52,322 @@ def evaluate_metrics(question: str, ground_truth: str, prediction: str, context:
 4. **Groundedness (0-5):** Is the answer based solely on the provided context (if applicable)?
 5. **Fluency (0-5):** Is the answer well-written, clear, and professional?
 
+**Score Anchors:**
+
+Relevance
+- 5: Answers exactly what was asked, with no unrelated material.
+- 4: Answers the question, with minor tangents that do not distract.
+- 3: Partly answers the question, or buries the answer among unrelated content.
+- 2: Mostly about a related topic; the actual question is only touched on.
+- 1: Acknowledges the question but does not answer it.
+- 0: Unrelated to the question, empty, or an error message.
+
+Accuracy
+- 5: Every product name, specification, price and claim agrees with the ground truth.
+- 4: Agrees with the ground truth, with one minor imprecision that would not mislead a customer.
+- 3: The main point agrees with the ground truth, but a secondary detail is wrong.
+- 2: Mixes correct and incorrect facts, so a customer could be misled.
+- 1: The main point contradicts the ground truth.
+- 0: Entirely incorrect, or invents products that do not exist.
+
+Completeness
+- 5: Covers every key point in the ground truth, with the details a customer needs to decide.
+- 4: Covers every key point, but omits a useful detail.
+- 3: Covers the main point but misses at least one key point from the ground truth.
+- 2: Covers only a small part of what the ground truth contains.
+- 1: Gives a fragment with no usable detail.
+- 0: Contains none of the expected information.
+
+Groundedness
+- 5: Every claim can be traced to the provided context, or no context was provided and the answer makes no unsupported product claims.
+- 4: Grounded in the context, with a harmless general remark (for example, general camping advice).
+- 3: Mostly grounded, but adds a product detail that the context does not support.
+- 2: Several claims go beyond the context.
+- 1: Largely ignores the context in favour of outside knowledge.
+- 0: Contradicts the context or fabricates product details.
+
+Fluency
+- 5: Clear, well organized, grammatically correct and professional in tone.
+- 4: Clear and professional, with minor awkward phrasing.
+- 3: Understandable, but wordy, repetitive or loosely organized.
+- 2: Hard to follow because of grammar or structure problems.
+- 1: Barely readable.
+- 0: Unreadable, empty, or an error message.
+
+**Calibration Examples:**
+
+Example A
+Question: Which tent is the most waterproof?
+Ground truth: The Alpine Explorer Tent has the highest rainfly waterproof rating at 3000mm.
+Answer: The Alpine Explorer Tent is our most waterproof option, with a 3000mm rainfly rating.
+Scores: relevance 5, accuracy 5, completeness 5, groundedness 5, fluency 5.
+
+Example B
+Question: Which tent is the most waterproof?
+Ground truth: The Alpine Explorer Tent has the highest rainfly waterproof rating at 3000mm.
+Answer: All of our tents are waterproof and great for camping in the rain.
+Scores: relevance 3, accuracy 2, completeness 1, groundedness 3, fluency 4.
+
+Example C
+Question: How much does the TrailWalker hiking shoe cost?
+Ground truth: The TrailWalker Hiking Shoes cost $110.
+Answer: The TrailWalker costs $150 and comes with a lifetime warranty.
+Scores: relevance 5, accuracy 1, completeness 2, groundedness 1, fluency 5.
+
+**Special Cases:**
+- If the answer says the information is not available and the ground truth confirms it is not in the catalog, score accuracy and completeness 5.
+- If the answer declines to answer although the ground truth contains the information, score relevance, accuracy and completeness 1 or lower.
+- If no context is provided, judge groundedness by whether the answer avoids specific product claims that the ground truth does not support.
+- Ignore greetings, sign-offs and offers of further help when scoring completeness and relevance.
+- Minor differences in units or formatting (for example 3000mm versus 3,000 mm) are not accuracy errors.
+
 **Instructions:**
 - Provide a score (0-5) for each criterion
+- Use the score anchors above; half points are allowed between two anchors
+- Score each criterion independently; a fluent answer can still be inaccurate
 - Be objective and fair
 - Consider that ground truth may be a summary, not the exact expected answer
+- Do not reward length; a short answer that covers the key points is complete
+- Keep the reasoning to one or two sentences
 - Return ONLY valid JSON with this structure:
 
-{{
+{
     "relevance": <score 0-5>,
     "accuracy": <score 0-5>,
     "completeness": <score 0-5>,
     "groundedness": <score 0-5>,
     "fluency": <score 0-5>,
     "reasoning": "<brief explanation of scores>"
-}}
+}
+"""
+
+# Metrics every evaluation contains
+REQUIRED_FIELDS = ["relevance", "accuracy", "completeness", "groundedness", "fluency"]
+
+
+class Evaluation(BaseModel):
+    """Judge verdict schema, enforced by Azure OpenAI structured outputs."""
+    relevance: float
+    accuracy: float
+    completeness: float
+    groundedness: float
+    fluency: float
+    reasoning: str
+
+
+# Per-case user message; only these fields are filled in on each call
+EVAL_PROMPT_TEMPLATE = """**Question:** {question}
+
+**Ground Truth (Expected Answer):** {ground_truth}
+
+**Generated Answer:** {prediction}
+
+**Context Used:** {context}
 """
+
+
+# Built once per process (the async client once per event loop) so HTTP connections and TLS sessions are reused
+@lru_cache(maxsize=1)
+def _client() -> AzureOpenAI:
+    return AzureOpenAI(
+        api_key=AZURE_OPENAI_API_KEY,
+        api_version=JUDGE_API_VERSION,
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        http_client=http_client()
+    )
+
+
+@per_event_loop
+def _async_client() -> AsyncAzureOpenAI:
+    return AsyncAzureOpenAI(
+        api_key=AZURE_OPENAI_API_KEY,
+        api_version=JUDGE_API_VERSION,
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        http_client=async_http_client(),
+        max_retries=0  # Retries are handled by retry_transient with jittered backoff
+    )
+
+
+def _build_request(question: str, ground_truth: str, prediction: str, context: str) -> dict:
+    """Build the judge request body, shared by the sync and async evaluators."""
+    # Only the per-case fields go in the user message; the rubric is the static system prompt
+    eval_prompt = EVAL_PROMPT_TEMPLATE.format(
+        question=question,
+        ground_truth=ground_truth,
+        prediction=prediction,
+        context=context if context else "No context provided"
+    )
+    
+    return {
+        "model": AZURE_DEPLOYMENT_NAME,
+        "messages": [
+            {"role": "system", "content": EVAL_SYSTEM_PROMPT},
+            {"role": "user", "content": eval_prompt}
+        ],
+        "temperature": 0.1,  # Low temperature for consistent evaluation
+        "max_tokens": 500,
+        "response_format": Evaluation  # Structured outputs: the SDK returns a validated Evaluation
+    }
+
+
+def build_batch_request(question: str, ground_truth: str, prediction: str, context: str = "") -> dict:
+    """
+    Build the judge request body as a Batch API line body.
+
+    Batch bodies are serialized to JSONL, so the Evaluation class is replaced by JSON mode;
+    the rubric already asks for exactly the Evaluation fields. Parse replies with parse_evaluation.
+    """
+    request = _build_request(question, ground_truth, prediction, context)
+    request["response_format"] = {"type": "json_object"}
+    return request
+
+
+def parse_evaluation(content: str) -> dict:
+    """Validate a judge reply against the Evaluation schema and return it as a dict."""
+    return Evaluation.model_validate_json(content).model_dump()
+
+
+def _truncate_prediction(prediction: str) -> str:
+    return prediction[:200] + "..." if len(prediction) > 200 else prediction
+
+
+def _default_result(error: Exception, question: str, prediction: str) -> dict:
+    """Default scores returned when evaluation fails."""
+    return {
+        "relevance": 3.0,
+        "accuracy": 3.0,
+        "completeness": 3.0,
+        "groundedness": 3.0,
+        "fluency": 3.0,
+        "reasoning": f"Evaluation failed: {str(error)}",
+        "error": str(error),
+        "question": question,
+        "prediction": _truncate_prediction(prediction)
+    }
+
+
+def _is_empty_or_error(prediction: str) -> bool:
+    """True when generation produced no answer or failed upstream, so there is nothing to judge."""
+    return not prediction or not prediction.strip() or prediction.startswith("ERROR:")
+
+
+def _skipped_result(question: str, prediction: str) -> dict:
+    """Zero scores for an empty or error prediction, returned without calling GPT-4o."""
+    result = {field: 0.0 for field in REQUIRED_FIELDS}
+    result["reasoning"] = "Empty or error prediction; evaluation skipped"
+    result["question"] = question
+    result["prediction"] = _truncate_prediction(prediction or "")
+    return result
+
+
+@retry_transient
+async def _parse_completion_async(request: dict) -> Evaluation:
+    """Send one judge request, retrying rate limits and transient errors with jittered backoff."""
+    # Wait for request and token quota instead of pausing blindly; each retry re-acquires it
+    await _RATE_LIMITER.acquire(estimate_tokens(request["messages"], request["max_tokens"]))
+
+    response = await _async_client().beta.chat.completions.parse(**request)
+    message = response.choices[0].message
+    if message.parsed is None:
+        raise ValueError(f"Model refused to respond: {message.refusal}")
+    return message.parsed
+
+
+@tool
+def evaluate_metrics(question: str, ground_truth: str, prediction: str, context: str = "") -> dict:
+    """
+    Evaluate the quality of the copilot's answer using GPT-4o as a judge.
+    
+    Args:
+        question: User's question
+        ground_truth: Expected answer or key information
+        prediction: Generated answer from copilot
+        context: Retrieved product context (optional)
+    
+    Returns:
+        Dictionary with evaluation metrics (0-5 scale):
+        - relevance: Does it address the question?
+        - accuracy: Is information factually correct?
+        - completeness: Sufficient detail provided?
+        - groundedness: Based on context only?
+        - fluency: Well-written and clear?
+    """
+    
+    if _is_empty_or_error(prediction):
+        return _skipped_result(question, prediction)
+    
+    request = _build_request(question, ground_truth, prediction, context)
     
     try:
-        # Call GPT-4o for evaluation
-        response = client.chat.completions.create(
-            model=deployment_name,
-            messages=[
-                {"role": "system", "content": "You are an expert AI evaluator. Return only valid JSON."},
-                {"role": "user", "content": eval_prompt}
-            ],
-            temperature=0.1,  # Low temperature for consistent evaluation
-            max_tokens=500,
-            response_format={"type": "json_object"}
-        )
+        # Serve verdicts for near-identical inputs from the semantic cache
+        cache_embedding = None
+        evaluation = None
+        if _SEMANTIC_CACHE is not None:
+            cache_embedding = _SEMANTIC_CACHE.embed(canonicalize(question, ground_truth, prediction))
+            evaluation = _SEMANTIC_CACHE.lookup(cache_embedding)
         
-        # Parse the evaluation result
-        evaluation = json.loads(response.choices[0].message.content)
-        
-        # Ensure all required fields are present
-        required_fields = ["relevance", "accuracy", "completeness", "groundedness", "fluency"]
-        for field in required_fields:
-            if field not in evaluation:
-                evaluation[field] = 3.0  # Default to middle score if missing
+        if evaluation is None:
+            # Call GPT-4o for evaluation (exact repeats are served from the disk cache)
+            evaluation = cached_parse(_client(), **request).model_dump()
+            
+            if cache_embedding is not None:
+                _SEMANTIC_CACHE.insert(cache_embedding, evaluation)
         
         # Add metadata
         evaluation["question"] = question
-        evaluation["prediction"] = prediction[:200] + "..." if len(prediction) > 200 else prediction
+        evaluation["prediction"] = _truncate_prediction(prediction)
+        
+        # Returned as a dict; the flow's object-typed output passes it on without a JSON round-trip
+        return evaluation
+        
+    except Exception as e:
+        # Return default scores if evaluation fails
+        return _default_result(e, question, prediction)
+
+
+async def evaluate_metrics_async(question: str, ground_truth: str, prediction: str, context: str = "") -> dict:
+    """
+    Async variant of evaluate_metrics for concurrent batch evaluation.
+    
+    Args:
+        question: User's question
+        ground_truth: Expected answer or key information
+        prediction: Generated answer from copilot
+        context: Retrieved product context (optional)
+    
+    Returns:
+        Dictionary with the same evaluation metrics as evaluate_metrics
+    """
+    
+    if _is_empty_or_error(prediction):
+        return _skipped_result(question, prediction)
+    
+    request = _build_request(question, ground_truth, prediction, context)
+    
+    try:
+        cache_embedding = None
+        evaluation = None
+        if _SEMANTIC_CACHE is not None:
+            cache_embedding = await asyncio.to_thread(
+                _SEMANTIC_CACHE.embed, canonicalize(question, ground_truth, prediction)
+            )
+            evaluation = _SEMANTIC_CACHE.lookup(cache_embedding)
+        
+        if evaluation is None:
+            content = lookup_completion(**request)
+            if content is not None:
+                verdict = Evaluation.model_validate_json(content)
+            else:
+                verdict = await _parse_completion_async(request)
+                store_completion(verdict.model_dump_json(), **request)
+            evaluation = verdict.model_dump()
+            
+            if cache_embedding is not None:
+                _SEMANTIC_CACHE.insert(cache_embedding, evaluation)
         
-        # Return as JSON string (required for Prompt Flow string output type)
-        return json.dumps(evaluation)
+        evaluation["question"] = question
+        evaluation["prediction"] = _truncate_prediction(prediction)
+        return evaluation
         
     except Exception as e:
-        # Return default scores if evaluation fails (as JSON string)
-        default_result = {
-            "relevance": 3.0,
-            "accuracy": 3.0,
-            "completeness": 3.0,
-            "groundedness": 3.0,
-            "fluency": 3.0,
-            "reasoning": f"Evaluation failed: {str(e)}",
-            "error": str(e),
-            "question": question,
-            "prediction": prediction[:200] + "..." if len(prediction) > 200 else prediction
-        }
-        return json.dumps(default_result)
+        return _default_result(e, question, prediction)
@@ -2,13 +2,17 @@
 Test script for outlander_evaluation flow
 """
 
+import asyncio
+import os
 import sys
 from pathlib import Path
 
+import orjson
+
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from evaluate_metrics import evaluate_metrics
+from evaluate_metrics import evaluate_metrics, evaluate_metrics_async
 from calculate_score import calculate_score
 
 
@@ -60,5 +64,48 @@ def test_evaluation():
     print("Evaluation test complete!")
 
 
+# Maximum number of cases being judged at once; size to the Azure OpenAI TPM quota
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "8"))
+
+
+async def eval_and_score(case: dict, semaphore: asyncio.Semaphore) -> dict:
+    """Run both evaluation steps for one case, so other cases proceed while it waits on GPT-4o"""
+    async with semaphore:
+        evaluation = await evaluate_metrics_async(
+            question=case["question"],
+            ground_truth=case["ground_truth"],
+            prediction=case["prediction"],
+            context=case.get("context", "")
+        )
+    evaluation["overall_score"] = calculate_score(evaluation)
+    return evaluation
+
+
+async def test_evaluation_batch_async(data_file: Path = None) -> list:
+    """Evaluate every case in data.jsonl concurrently"""
+    data_file = data_file or Path(__file__).parent / "data.jsonl"
+    
+    with open(data_file, 'rb') as f:
+        cases = [orjson.loads(line) for line in f if line.strip()]
+    
+    print(f"Evaluating {len(cases)} cases with up to {MAX_CONCURRENCY} concurrent requests")
+    print("=" * 60)
+    
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    evaluations = await asyncio.gather(*[eval_and_score(case, semaphore) for case in cases])
+    
+    pass_threshold = 3.5
+    for evaluation in evaluations:
+        status = "PASS ✓" if evaluation["overall_score"] >= pass_threshold else "FAIL ✗"
+        print(f"{evaluation['overall_score']:.2f}/5.0 {status}  {evaluation['question']}")
+    
+    print("\n" + "=" * 60)
+    print("Batch evaluation test complete!")
+    return evaluations
+
+
 if __name__ == "__main__":
-    test_evaluation()
+    if "--batch" in sys.argv[1:]:
+        asyncio.run(test_evaluation_batch_async())
+    else:
+        test_evaluation()
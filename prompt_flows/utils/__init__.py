@@ -0,0 +1,4 @@
+"""
+Shared helpers for the Outlander prompt flows
+Included into each flow snapshot via additional_includes in flow.dag.yaml
+"""
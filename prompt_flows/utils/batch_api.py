@@ -0,0 +1,107 @@
+"""
+Azure OpenAI Batch API helper for offline, latency-insensitive runs
+Serializes chat requests to JSONL, submits one batch job, polls it, and maps results back by custom_id
+"""
+
+import json
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from openai import AzureOpenAI
+
+from .config import (
+    AZURE_OPENAI_API_KEY,
+    AZURE_OPENAI_API_VERSION,
+    AZURE_OPENAI_ENDPOINT,
+    BATCH_POLL_SECONDS,
+)
+
+# Statuses after which a batch job will make no further progress
+_TERMINAL_FAILURES = {"failed", "expired", "cancelled"}
+
+
+# Built once per process so HTTP connections and TLS sessions are reused
+@lru_cache(maxsize=1)
+def _batch_client() -> AzureOpenAI:
+    return AzureOpenAI(
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        api_key=AZURE_OPENAI_API_KEY,
+        api_version=AZURE_OPENAI_API_VERSION
+    )
+
+
+def write_batch_file(requests: dict, path: Path) -> Path:
+    """
+    Write one Batch API line per request.
+
+    Args:
+        requests: Mapping of custom_id to chat completion request body
+        path: Destination JSONL file
+
+    Returns:
+        The written path
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for custom_id, body in requests.items():
+            line = {"custom_id": custom_id, "method": "POST", "url": "/chat/completions", "body": body}
+            f.write(json.dumps(line) + "\n")
+    return path
+
+
+def run_chat_batch(requests: dict, path: Path, poll_interval: float = None) -> dict:
+    """
+    Submit chat completion requests as a single batch job and wait for the results.
+
+    Args:
+        requests: Mapping of custom_id to chat completion request body
+        path: Where to write the batch input JSONL
+        poll_interval: Seconds between status checks (default BATCH_POLL_SECONDS or 30)
+
+    Returns:
+        Mapping of custom_id to {"content": str or None, "error": str or None}
+    """
+    if poll_interval is None:
+        poll_interval = BATCH_POLL_SECONDS
+
+    client = _batch_client()
+    write_batch_file(requests, path)
+
+    with open(path, 'rb') as f:
+        batch_file = client.files.create(file=f, purpose="batch")
+
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/chat/completions",
+        completion_window="24h"
+    )
+    print(f"Submitted batch job {batch.id} with {len(requests)} requests")
+
+    while batch.status != "completed":
+        if batch.status in _TERMINAL_FAILURES:
+            raise RuntimeError(f"Batch job {batch.id} ended with status '{batch.status}'")
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+        counts = batch.request_counts
+        if counts is not None:
+            print(f"  Batch {batch.status}: {counts.completed}/{counts.total} completed, {counts.failed} failed")
+
+    results = {custom_id: {"content": None, "error": "No result returned by batch job"} for custom_id in requests}
+
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") == 200:
+                content = response["body"]["choices"][0]["message"]["content"]
+                results[record["custom_id"]] = {"content": content, "error": None}
+            else:
+                error = record.get("error") or response.get("body", {}).get("error") or response
+                results[record["custom_id"]] = {"content": None, "error": str(error)}
+
+    return results
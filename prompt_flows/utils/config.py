@@ -0,0 +1,35 @@
+"""
+Environment configuration for the Outlander prompt flows
+Loads the project .env once per process and exposes the Azure settings the flow nodes share
+"""
+
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file (a no-op when deployed, where settings come from the environment)
+ENV_PATH = Path(__file__).parent.parent.parent / '.env'
+load_dotenv(dotenv_path=ENV_PATH)
+
+# Azure OpenAI chat deployment
+AZURE_OPENAI_ENDPOINT = os.getenv('AZURE_OPENAI_ENDPOINT')
+AZURE_OPENAI_API_KEY = os.getenv('AZURE_OPENAI_API_KEY')
+AZURE_OPENAI_API_VERSION = os.getenv('AZURE_OPENAI_API_VERSION')
+# Fallback for the judges, which rely on structured outputs (2024-08-01-preview or later)
+JUDGE_API_VERSION = AZURE_OPENAI_API_VERSION or '2025-01-01-preview'
+AZURE_DEPLOYMENT_NAME = os.getenv('AZURE_DEPLOYMENT_NAME', 'gpt-4o')
+
+# Azure OpenAI embedding deployment
+AZURE_EMBEDDING_ENDPOINT = os.getenv('AZURE_EMBEDDING_ENDPOINT')
+AZURE_EMBEDDING_API_KEY = os.getenv('AZURE_EMBEDDING_API_KEY')
+AZURE_EMBEDDING_API_VERSION = os.getenv('AZURE_EMBEDDING_API_VERSION')
+AZURE_EMBEDDING_DEPLOYMENT_NAME = os.getenv('AZURE_EMBEDDING_DEPLOYMENT_NAME')
+
+# Azure AI Search
+AZURE_SEARCH_ENDPOINT = os.getenv('AZURE_SEARCH_ENDPOINT')
+AZURE_SEARCH_API_KEY = os.getenv('AZURE_SEARCH_API_KEY')
+AZURE_SEARCH_INDEX_NAME = os.getenv('AZURE_SEARCH_INDEX_NAME', 'outlander-products-index')
+
+# Azure OpenAI Batch API
+BATCH_POLL_SECONDS = float(os.getenv('BATCH_POLL_SECONDS', '30'))
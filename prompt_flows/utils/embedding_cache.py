@@ -0,0 +1,113 @@
+"""
+Persistent embedding cache for repeated queries
+Keyed by SHA-256 of the embedding model and input text; vectors are stored as float32 bytes
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+import diskcache
+import numpy as np
+
+# Shares the project-root cache directory with the completion cache (override with EMBEDDING_CACHE_DIR)
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent.parent / ".llm_cache" / "embeddings"
+
+# Maximum inputs per embeddings request accepted by Azure OpenAI
+EMBEDDING_BATCH_SIZE = 16
+
+_cache = None
+
+
+def _get_cache():
+    """Open the disk cache on first use; returns None when disabled with EMBEDDING_CACHE=0."""
+    global _cache
+    if os.getenv('EMBEDDING_CACHE', '1') == '0':
+        return None
+    if _cache is None:
+        _cache = diskcache.Cache(os.getenv('EMBEDDING_CACHE_DIR', str(DEFAULT_CACHE_DIR)))
+    return _cache
+
+
+def embedding_cache_key(model: str, text: str) -> str:
+    """SHA-256 over the model name and input text."""
+    return hashlib.sha256(f"{model}\n{text}".encode()).hexdigest()
+
+
+def find_uncached_texts(model: str, texts: list) -> tuple:
+    """
+    Split texts into cached vectors and the positions that still need embedding.
+
+    Args:
+        model: Embedding deployment name
+        texts: Input texts
+
+    Returns:
+        (vectors, missing) where vectors holds a list per text (None on a miss)
+        and missing lists the indexes of the misses
+    """
+    cache = _get_cache()
+    if cache is None:
+        return [None] * len(texts), list(range(len(texts)))
+
+    vectors = []
+    missing = []
+    for i, text in enumerate(texts):
+        data = cache.get(embedding_cache_key(model, text))
+        if data is None:
+            missing.append(i)
+            vectors.append(None)
+        else:
+            vectors.append(np.frombuffer(data, dtype=np.float32).tolist())
+    return vectors, missing
+
+
+def store_embedding(model: str, text: str, vector: list):
+    """Store one embedding as float32 bytes."""
+    cache = _get_cache()
+    if cache is not None:
+        cache.set(embedding_cache_key(model, text), np.asarray(vector, dtype=np.float32).tobytes())
+
+
+def cached_embeddings(client, model: str, texts: list) -> list:
+    """
+    Embed texts through the cache, sending only the misses to the API in batches.
+
+    Args:
+        client: AzureOpenAI client
+        model: Embedding deployment name
+        texts: Input texts
+
+    Returns:
+        One embedding (list of floats) per text, in order
+    """
+    vectors, missing = find_uncached_texts(model, texts)
+    for start in range(0, len(missing), EMBEDDING_BATCH_SIZE):
+        batch = missing[start:start + EMBEDDING_BATCH_SIZE]
+        response = client.embeddings.create(input=[texts[i] for i in batch], model=model)
+        for i, item in zip(batch, response.data):
+            vectors[i] = item.embedding
+            store_embedding(model, texts[i], item.embedding)
+    return vectors
+
+
+async def cached_embeddings_async(client, model: str, texts: list) -> list:
+    """
+    Async variant of cached_embeddings.
+
+    Args:
+        client: AsyncAzureOpenAI client
+        model: Embedding deployment name
+        texts: Input texts
+
+    Returns:
+        One embedding (list of floats) per text, in order
+    """
+    vectors, missing = find_uncached_texts(model, texts)
+    for start in range(0, len(missing), EMBEDDING_BATCH_SIZE):
+        batch = missing[start:start + EMBEDDING_BATCH_SIZE]
+        response = await client.embeddings.create(input=[texts[i] for i in batch], model=model)
+        for i, item in zip(batch, response.data):
+            vectors[i] = item.embedding
+            store_embedding(model, texts[i], item.embedding)
+    return vectors
@@ -0,0 +1,75 @@
+"""
+Shared HTTP connection pools for the Azure OpenAI clients
+One HTTP/2 httpx client per process (per event loop for the async one) multiplexes requests
+over a few kept-alive connections
+"""
+
+import asyncio
+import functools
+import os
+import weakref
+from functools import lru_cache
+
+import httpx
+
+
+def _pool_settings() -> dict:
+    """Pool limits and timeout shared by the sync and async clients."""
+    return {
+        "http2": True,
+        "limits": httpx.Limits(
+            max_connections=int(os.getenv('HTTP_MAX_CONNECTIONS', '64')),
+            max_keepalive_connections=int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', '32'))
+        ),
+        "timeout": float(os.getenv('HTTP_TIMEOUT_SECONDS', '30'))
+    }
+
+
+def per_event_loop(factory):
+    """
+    Cache an async client factory's result per running event loop.
+
+    Async clients hold connections bound to the loop they were first used on. Keyed by
+    the loop, a later asyncio.run in the same process (a flow run, then a batch run)
+    builds fresh clients instead of reusing a pool tied to a closed loop; the entries
+    of a finished loop are dropped with it.
+    """
+    instances = weakref.WeakKeyDictionary()
+
+    @functools.wraps(factory)
+    def wrapper():
+        loop = asyncio.get_running_loop()
+        if loop not in instances:
+            instances[loop] = factory()
+        return instances[loop]
+
+    return wrapper
+
+
+@per_event_loop
+def async_http_client() -> httpx.AsyncClient:
+    """
+    Build the async HTTP client for the running event loop on first use.
+
+    Pool size and timeout can be tuned with HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS and HTTP_TIMEOUT_SECONDS.
+
+    Returns:
+        httpx.AsyncClient with HTTP/2 enabled
+    """
+    return httpx.AsyncClient(**_pool_settings())
+
+
+@lru_cache(maxsize=1)
+def http_client() -> httpx.Client:
+    """
+    Build the process-wide sync HTTP client on first use.
+
+    Used by the sync clients that flow nodes call once per case, so consecutive
+    runs in one process reuse the same TLS connections. Tuned with the same
+    environment variables as async_http_client.
+
+    Returns:
+        httpx.Client with HTTP/2 enabled
+    """
+    return httpx.Client(**_pool_settings())
@@ -0,0 +1,101 @@
+"""
+Exact-match disk cache for deterministic chat completions
+Keyed by SHA-256 of the messages, model and sampling parameters
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import diskcache
+
+# Cache lives under the project root so CI reruns reuse it (override with LLM_CACHE_DIR)
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent.parent / ".llm_cache"
+
+_cache = None
+
+
+def _get_cache():
+    """Open the disk cache on first use; returns None when disabled with LLM_CACHE=0."""
+    global _cache
+    if os.getenv('LLM_CACHE', '1') == '0':
+        return None
+    if _cache is None:
+        _cache = diskcache.Cache(os.getenv('LLM_CACHE_DIR', str(DEFAULT_CACHE_DIR)))
+    return _cache
+
+
+def _schema_default(value):
+    """Key Pydantic response_format classes by their JSON schema."""
+    if hasattr(value, "model_json_schema"):
+        return value.model_json_schema()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def completion_cache_key(messages: list, **kwargs) -> str:
+    """SHA-256 over the canonical JSON of the request."""
+    payload = json.dumps({"messages": messages, **kwargs}, sort_keys=True, default=_schema_default)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def lookup_completion(messages: list, **kwargs):
+    """Return the cached completion text for this request, or None on a miss."""
+    cache = _get_cache()
+    if cache is None:
+        return None
+    return cache.get(completion_cache_key(messages, **kwargs))
+
+
+def store_completion(content: str, messages: list, **kwargs):
+    """Store the completion text for this request."""
+    cache = _get_cache()
+    if cache is not None and content is not None:
+        cache.set(completion_cache_key(messages, **kwargs), content)
+
+
+def cached_completion(client, messages: list, **kwargs) -> str:
+    """
+    Call client.chat.completions.create through the disk cache.
+
+    Args:
+        client: AzureOpenAI client
+        messages: Chat messages
+        **kwargs: Remaining create() arguments (model, temperature, ...), all part of the key
+
+    Returns:
+        Completion message content
+    """
+    content = lookup_completion(messages, **kwargs)
+    if content is None:
+        response = client.chat.completions.create(messages=messages, **kwargs)
+        content = response.choices[0].message.content
+        store_completion(content, messages, **kwargs)
+    return content
+
+
+def cached_parse(client, response_format, messages: list, **kwargs):
+    """
+    Call client.beta.chat.completions.parse through the disk cache.
+
+    Args:
+        client: AzureOpenAI client
+        response_format: Pydantic model the response must conform to
+        messages: Chat messages
+        **kwargs: Remaining parse() arguments (model, temperature, ...), all part of the key
+
+    Returns:
+        Instance of response_format
+    """
+    content = lookup_completion(messages, response_format=response_format, **kwargs)
+    if content is not None:
+        return response_format.model_validate_json(content)
+
+    response = client.beta.chat.completions.parse(
+        messages=messages, response_format=response_format, **kwargs
+    )
+    message = response.choices[0].message
+    if message.parsed is None:
+        raise ValueError(f"Model refused to respond: {message.refusal}")
+    store_completion(message.content, messages, response_format=response_format, **kwargs)
+    return message.parsed
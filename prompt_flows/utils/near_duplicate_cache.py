@@ -0,0 +1,122 @@
+"""
+Near-duplicate cache for document embeddings
+Keyed by MinHash signatures of word shingles, so a text that is almost identical to one
+already embedded (shared boilerplate, a changed price) reuses its embedding instead of
+calling the API
+"""
+
+import os
+import re
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+# Shares the project-root cache directory with the exact-match embedding cache
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent.parent / ".llm_cache" / "near_duplicates"
+DEFAULT_THRESHOLD = 0.98
+
+NUM_PERMUTATIONS = 128
+SHINGLE_WORDS = 5
+
+# Universal hashing modulo a prime below 2**32 keeps a * h + b inside uint64
+_PRIME = np.uint64(4294967291)
+_rng = np.random.default_rng(20240611)  # Fixed seed: signatures must match across runs
+_A = _rng.integers(1, int(_PRIME), NUM_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, int(_PRIME), NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """
+    MinHash signature of the text's word shingles.
+
+    The fraction of positions two signatures share estimates the Jaccard similarity
+    of their shingle sets.
+
+    Args:
+        text: Input text
+
+    Returns:
+        uint32 array of NUM_PERMUTATIONS minimum hashes
+    """
+    words = re.findall(r"\w+", text.lower())
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(len(words) - SHINGLE_WORDS + 1, 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+    hashes %= _PRIME
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+class NearDuplicateCache:
+    """Signatures and embeddings held as parallel arrays; lookups compare against all rows at once."""
+
+    def __init__(self, cache_dir: Path, threshold: float = DEFAULT_THRESHOLD):
+        """
+        Args:
+            cache_dir: Directory holding the persisted signatures and embeddings
+            threshold: Minimum estimated Jaccard similarity for a cache hit
+        """
+        self.cache_dir = Path(cache_dir)
+        self.threshold = threshold
+        self._signatures_path = self.cache_dir / "signatures.npy"
+        self._vectors_path = self.cache_dir / "vectors.npy"
+        self._pending = []
+
+        if self._signatures_path.exists() and self._vectors_path.exists():
+            self._signatures = np.load(self._signatures_path)
+            self._vectors = np.load(self._vectors_path)
+        else:
+            self._signatures = np.empty((0, NUM_PERMUTATIONS), dtype=np.uint32)
+            self._vectors = None
+
+    def lookup(self, signature: np.ndarray):
+        """Return the embedding of the most similar cached text if it clears the threshold."""
+        self._flush()
+        if not len(self._signatures):
+            return None
+        similarities = (self._signatures == signature).mean(axis=1)
+        best = int(similarities.argmax())
+        if similarities[best] >= self.threshold:
+            return self._vectors[best].tolist()
+        return None
+
+    def add(self, signature: np.ndarray, vector: list):
+        """Queue an embedding; it is visible to the next lookup and written by save()."""
+        self._pending.append((signature, np.asarray(vector, dtype=np.float32)))
+
+    def save(self):
+        """Persist both arrays to disk."""
+        self._flush()
+        if self._vectors is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        np.save(self._signatures_path, self._signatures)
+        np.save(self._vectors_path, self._vectors)
+
+    def _flush(self):
+        # Appends are batched so a run of misses costs one concatenate, not one per embedding
+        if not self._pending:
+            return
+        signatures, vectors = zip(*self._pending)
+        self._pending = []
+        self._signatures = np.vstack([self._signatures, *signatures])
+        new_vectors = np.vstack(vectors)
+        self._vectors = new_vectors if self._vectors is None else np.vstack([self._vectors, new_vectors])
+
+
+def get_near_duplicate_cache(model: str):
+    """
+    Open the near-duplicate cache for a model when EMBEDDING_NEAR_DUP_CACHE=1, otherwise return None.
+
+    Off by default: a hit gives a document the embedding of a slightly different text.
+
+    Args:
+        model: Embedding deployment name; each model has its own cache
+
+    Returns:
+        NearDuplicateCache instance, or None when disabled
+    """
+    if os.getenv('EMBEDDING_NEAR_DUP_CACHE', '0') != '1':
+        return None
+    cache_dir = Path(os.getenv('EMBEDDING_NEAR_DUP_CACHE_DIR', DEFAULT_CACHE_DIR)) / model
+    threshold = float(os.getenv('EMBEDDING_NEAR_DUP_THRESHOLD', DEFAULT_THRESHOLD))
+    return NearDuplicateCache(cache_dir, threshold=threshold)
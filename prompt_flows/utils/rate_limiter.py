@@ -0,0 +1,76 @@
+"""
+Proactive rate limiting for Azure OpenAI calls
+Token bucket over requests-per-minute and tokens-per-minute, refilled continuously
+"""
+
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Async token bucket tracking both request and token capacity per minute."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        """
+        Args:
+            requests_per_minute: Maximum requests allowed per minute
+            tokens_per_minute: Maximum tokens (prompt + completion) allowed per minute
+        """
+        self.max_requests_per_minute = float(requests_per_minute)
+        self.max_tokens_per_minute = float(tokens_per_minute)
+        self.available_request_capacity = self.max_requests_per_minute
+        self.available_token_capacity = self.max_tokens_per_minute
+        self._last_update = time.monotonic()
+        self._lock = None
+        self._lock_loop = None
+
+    def _refill(self):
+        """Top up both buckets in proportion to the time since the last refill."""
+        now = time.monotonic()
+        elapsed = now - self._last_update
+        self._last_update = now
+
+        self.available_request_capacity = min(
+            self.max_requests_per_minute,
+            self.available_request_capacity + self.max_requests_per_minute * elapsed / 60.0
+        )
+        self.available_token_capacity = min(
+            self.max_tokens_per_minute,
+            self.available_token_capacity + self.max_tokens_per_minute * elapsed / 60.0
+        )
+
+    async def acquire(self, estimated_tokens: int):
+        """
+        Wait until there is capacity for one request of the given size, then consume it.
+
+        Args:
+            estimated_tokens: Estimated prompt + completion tokens for the request
+        """
+        # A request larger than the whole bucket would never fit; cap it so it waits for a full bucket
+        estimated_tokens = min(float(estimated_tokens), self.max_tokens_per_minute)
+
+        # The lock belongs to the loop it was created on; a later asyncio.run gets a new one
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+
+        async with self._lock:
+            while True:
+                self._refill()
+                if (self.available_request_capacity >= 1
+                        and self.available_token_capacity >= estimated_tokens):
+                    self.available_request_capacity -= 1
+                    self.available_token_capacity -= estimated_tokens
+                    return
+
+                # Sleep just long enough for the scarcer bucket to refill
+                request_wait = (1 - self.available_request_capacity) * 60.0 / self.max_requests_per_minute
+                token_wait = (estimated_tokens - self.available_token_capacity) * 60.0 / self.max_tokens_per_minute
+                await asyncio.sleep(max(request_wait, token_wait, 0.01))
+
+
+def estimate_tokens(messages: list, max_tokens: int) -> int:
+    """Rough token estimate for a chat request: ~4 characters per token plus the completion budget."""
+    prompt_chars = sum(len(str(msg.get("content", ""))) for msg in messages)
+    return prompt_chars // 4 + max_tokens
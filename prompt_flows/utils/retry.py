@@ -0,0 +1,20 @@
+"""
+Retry policy for transient Azure OpenAI failures
+Jittered exponential backoff on rate limits, connection errors and 5xx responses
+"""
+
+import openai
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+# Errors worth retrying; APITimeoutError is a subclass of APIConnectionError
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+MAX_ATTEMPTS = 5
+
+# Decorator for async or sync call wrappers; the last error is re-raised once attempts run out
+retry_transient = retry(
+    wait=wait_random_exponential(min=1, max=30),
+    stop=stop_after_attempt(MAX_ATTEMPTS),
+    retry=retry_if_exception_type(RETRYABLE_ERRORS),
+    reraise=True
+)
@@ -0,0 +1,141 @@
+"""
+Semantic cache for evaluator LLM calls
+Stores judge verdicts keyed by the embedding of the canonicalized evaluation inputs,
+so near-identical (question, ground_truth, prediction) triples skip the GPT-4o call
+"""
+
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from openai import AzureOpenAI
+
+from .config import (
+    AZURE_EMBEDDING_API_KEY,
+    AZURE_EMBEDDING_API_VERSION,
+    AZURE_EMBEDDING_DEPLOYMENT_NAME,
+    AZURE_EMBEDDING_ENDPOINT,
+)
+from .embedding_cache import cached_embeddings
+from .http_client import http_client
+from .retry import retry_transient
+
+try:
+    import faiss
+except ImportError:  # Optional dependency, only needed when the cache is enabled
+    faiss = None
+
+# Cache files live under the project root so they survive between runs
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent.parent / ".cache" / "semantic_eval"
+DEFAULT_THRESHOLD = 0.97
+EMBEDDING_DIMENSIONS = 1536
+
+
+# Built once per process and shared by every cache, over the pooled HTTP/2 connection
+@lru_cache(maxsize=1)
+def _embedding_client() -> AzureOpenAI:
+    return AzureOpenAI(
+        azure_endpoint=AZURE_EMBEDDING_ENDPOINT,
+        api_key=AZURE_EMBEDDING_API_KEY,
+        api_version=AZURE_EMBEDDING_API_VERSION,
+        http_client=http_client(),
+        max_retries=0  # Retries are handled by retry_transient with jittered backoff
+    )
+
+
+@retry_transient
+def _embed(texts: list) -> list:
+    """Embed texts through the embedding disk cache, retrying transient errors like every other embedding call."""
+    return cached_embeddings(_embedding_client(), AZURE_EMBEDDING_DEPLOYMENT_NAME, texts)
+
+
+def canonicalize(*fields: str) -> str:
+    """Normalize case and whitespace so trivially different inputs share a cache entry."""
+    return "\n\n".join(re.sub(r"\s+", " ", (field or "")).strip().lower() for field in fields)
+
+
+class SemanticCache:
+    """FAISS inner-product index of normalized embeddings with a parallel list of responses."""
+
+    def __init__(self, cache_dir: Path, threshold: float = DEFAULT_THRESHOLD,
+                 dimensions: int = EMBEDDING_DIMENSIONS):
+        """
+        Args:
+            cache_dir: Directory holding the persisted index and responses
+            threshold: Minimum cosine similarity for a cache hit
+            dimensions: Embedding dimensions of the index
+        """
+        self.cache_dir = Path(cache_dir)
+        self.threshold = threshold
+        self._index_path = self.cache_dir / "index.faiss"
+        self._responses_path = self.cache_dir / "responses.jsonl"
+        self._lock = threading.Lock()
+
+        if self._index_path.exists() and self._responses_path.exists():
+            self._index = faiss.read_index(str(self._index_path))
+            with open(self._responses_path, 'r', encoding='utf-8') as f:
+                self._responses = [json.loads(line) for line in f if line.strip()]
+            # A crash between the two writes in insert() leaves extra responses; row i must match response i
+            del self._responses[self._index.ntotal:]
+        else:
+            self._index = faiss.IndexFlatIP(dimensions)
+            self._responses = []
+            self._responses_path.unlink(missing_ok=True)
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed text as a unit-length float32 row vector, so inner product equals cosine."""
+        return self.embed_many([text])
+
+    def embed_many(self, texts: list) -> np.ndarray:
+        """Embed texts in requests of EMBEDDING_BATCH_SIZE; one unit-length row per text, in order."""
+        matrix = np.asarray(_embed(texts), dtype=np.float32)
+        faiss.normalize_L2(matrix)
+        return matrix
+
+    def lookup(self, embedding: np.ndarray):
+        """Return the cached response for the nearest neighbour if it clears the threshold."""
+        with self._lock:
+            if self._index.ntotal == 0:
+                return None
+            scores, ids = self._index.search(embedding, 1)
+            if scores[0][0] >= self.threshold:
+                return dict(self._responses[ids[0][0]])
+        return None
+
+    def insert(self, embedding: np.ndarray, response: dict):
+        """Add a response to the index and persist it; responses are appended, not rewritten."""
+        with self._lock:
+            self._index.add(embedding)
+            self._responses.append(dict(response))
+
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(self._responses_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(response) + "\n")
+            faiss.write_index(self._index, str(self._index_path))
+
+
+def get_semantic_cache(name: str, env_prefix: str = 'EVAL_SEMANTIC_CACHE'):
+    """
+    Open the named semantic cache when <env_prefix>=1, otherwise return None.
+
+    The directory and threshold are read from <env_prefix>_DIR and <env_prefix>_THRESHOLD.
+
+    Args:
+        name: Subdirectory for this cache
+        env_prefix: Environment variable that enables the cache and prefixes its settings
+
+    Returns:
+        SemanticCache instance, or None when caching is disabled
+    """
+    if os.getenv(env_prefix) != '1':
+        return None
+    if faiss is None:
+        raise ImportError(f"{env_prefix}=1 requires faiss: pip install faiss-cpu")
+
+    cache_dir = Path(os.getenv(f'{env_prefix}_DIR', DEFAULT_CACHE_DIR)) / name
+    threshold = float(os.getenv(f'{env_prefix}_THRESHOLD', DEFAULT_THRESHOLD))
+    return SemanticCache(cache_dir, threshold=threshold)
@@ -0,0 +1,38 @@
+"""
+Tests for token-aware truncation
+"""
+
+import sys
+from pathlib import Path
+
+# Shared helpers are imported as utils.*, the same module path the flow nodes use
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.tokens import get_encoding, truncate_tokens
+
+# Rare CJK characters outside the BMP: each is 4 UTF-8 bytes and more than one token
+MULTIBYTE_TEXT = "𠜎𠜱𠝹𠱓𠱸𠲖𠳏𠳕"
+
+
+def test_short_multibyte_text_over_budget_is_truncated():
+    """Text within the character budget but over the token budget must still be cut"""
+    max_tokens = 10
+    for model in ("gpt-4o", "text-embedding-ada-002"):
+        assert len(MULTIBYTE_TEXT) <= max_tokens
+        assert len(get_encoding(model).encode(MULTIBYTE_TEXT)) > max_tokens
+
+        truncated = truncate_tokens(MULTIBYTE_TEXT, max_tokens, model)
+        assert truncated != MULTIBYTE_TEXT
+
+
+def test_text_within_budget_is_unchanged():
+    """Text that fits is returned as is"""
+    text = "Which tent is the most waterproof?"
+    assert truncate_tokens(text, 8191) == text
+    assert truncate_tokens(MULTIBYTE_TEXT, 8191) == MULTIBYTE_TEXT
+
+
+if __name__ == "__main__":
+    test_short_multibyte_text_over_budget_is_truncated()
+    test_text_within_budget_is_unchanged()
+    print("Token truncation tests passed")
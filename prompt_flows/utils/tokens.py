@@ -0,0 +1,37 @@
+"""
+Token-aware truncation for text sent to Azure OpenAI
+Uses the GPT-4o tokenizer so budgets are measured in the units the model is billed in
+"""
+
+from functools import lru_cache
+
+import tiktoken
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = "gpt-4o") -> tiktoken.Encoding:
+    """Load the tokenizer for a model once per process."""
+    return tiktoken.encoding_for_model(model)
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-4o") -> str:
+    """
+    Cut text to at most max_tokens tokens.
+
+    Args:
+        text: Text to truncate
+        max_tokens: Token budget
+        model: Model whose tokenizer defines the budget
+
+    Returns:
+        The text unchanged if it fits, otherwise its first max_tokens tokens decoded back to text
+    """
+    # Every token covers at least one UTF-8 byte (not one character: an emoji or a rare CJK
+    # character can take several tokens), so text this short cannot exceed the budget
+    if len(text.encode('utf-8')) <= max_tokens:
+        return text
+
+    tokens = get_encoding(model).encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return get_encoding(model).decode(tokens[:max_tokens])
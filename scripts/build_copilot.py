@@ -3,13 +3,28 @@ Complete automation script for Outlander Gear Co. Copilot
 This script handles everything: data upload, index creation, prompt flow setup, and deployment.
 """
 
+import asyncio
+import hashlib
+import logging
 import os
+import re
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import requests
+from requests.adapters import HTTPAdapter
+import numpy as np
 from dotenv import load_dotenv
 from azure.identity import DefaultAzureCredential
+from openai import AsyncAzureOpenAI
 from azure.ai.ml import MLClient
+from azure.ai.ml.constants import AssetTypes
+from azure.ai.ml.entities import Data
 from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from azure.core.pipeline.transport import RequestsTransport
+from azure.search.documents import SearchClient
 from azure.search.documents.indexes import SearchIndexClient
 from azure.search.documents.indexes.models import (
     SearchIndex,
@@ -18,12 +33,351 @@ from azure.search.documents.indexes.models import (
     VectorSearch,
     VectorSearchProfile,
     HnswAlgorithmConfiguration,
+    HnswParameters,
+    VectorSearchAlgorithmMetric,
+    ScalarQuantizationCompression,
 )
-import time
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+import yaml
+
+# Prompt Flow is only needed by the test and deploy steps, which report it missing instead of failing the build
+try:
+    from promptflow import PFClient
+except ImportError:
+    PFClient = None
+try:
+    from promptflow.azure import PFClient as AzurePFClient
+except ImportError:
+    AzurePFClient = None
+
+# Shared helpers from the prompt flows, imported as utils.* like the flow nodes do
+sys.path.insert(0, str(Path(__file__).parent.parent / "prompt_flows"))
+from utils.embedding_cache import EMBEDDING_BATCH_SIZE, find_uncached_texts, store_embedding
+from utils.http_client import async_http_client
+from utils.near_duplicate_cache import get_near_duplicate_cache, minhash_signature
+from utils.retry import retry_transient
+from utils.tokens import truncate_tokens
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger("copilot.build")
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+# Input limit of the embedding model, in tokens
+EMBEDDING_MAX_TOKENS = 8191
+# Bump whenever the text or vectors sent to the index are built differently (truncation,
+# normalization, ...), so documents indexed by the old pipeline no longer match their hash
+PROCESSING_VERSION = "2"
+
+# Embedding requests in flight at once while indexing; size to the embedding deployment's quota
+MAX_EMBEDDING_CONCURRENCY = int(os.getenv('MAX_EMBEDDING_CONCURRENCY', '8'))
+
+# Documents per upload_documents request; Azure AI Search caps a request at 1000 documents / 16 MB
+UPLOAD_BATCH_SIZE = int(os.getenv('UPLOAD_BATCH_SIZE', '500'))
+MAX_UPLOAD_WORKERS = 4
+# Passes over documents the service reported as failed before giving up on them
+MAX_UPLOAD_ROUNDS = 3
+
+# Kept-alive connections per host in the transport shared by the Azure SDK clients
+SDK_POOL_SIZE = int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', '32'))
+
+
+def build_sdk_transport() -> RequestsTransport:
+    """One pooled requests session for every Azure SDK client, so TLS handshakes are paid once per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=SDK_POOL_SIZE, pool_maxsize=SDK_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # The builder owns the session; clients closing the transport must not close it under the others
+    return RequestsTransport(session=session, session_owner=False)
+
+
+def _is_retryable_upload_error(error: BaseException) -> bool:
+    # 413 is handled by splitting the batch, not by sending it again
+    return isinstance(error, HttpResponseError) and error.status_code != 413
+
+
+@retry(
+    retry=retry_if_exception(_is_retryable_upload_error),
+    wait=wait_exponential(multiplier=1, min=2, max=60),
+    stop=stop_after_attempt(5),
+    reraise=True
+)
+def _upload_batch(search_client, documents: list) -> list:
+    return search_client.merge_or_upload_documents(documents=documents)
+
+
+def upload_batch(search_client, documents: list) -> list:
+    """Upload one batch, halving it while the service rejects the request as too large."""
+    try:
+        return _upload_batch(search_client, documents)
+    except HttpResponseError as e:
+        if e.status_code != 413 or len(documents) == 1:
+            raise
+        middle = len(documents) // 2
+        return upload_batch(search_client, documents[:middle]) + upload_batch(search_client, documents[middle:])
+
+
+def upload_in_batches(search_client, documents: list, batch_size: int = UPLOAD_BATCH_SIZE,
+                      max_workers: int = MAX_UPLOAD_WORKERS) -> tuple:
+    """
+    Upload documents in concurrent batches, re-sending any the service reports as failed.
+
+    Args:
+        search_client: SearchClient for the target index
+        documents: Documents keyed by "id"
+        batch_size: Documents per request
+        max_workers: Batches uploaded at once
+
+    Returns:
+        (number of documents indexed, list of documents that still failed)
+    """
+    indexed = 0
+    pending = documents
+    
+    for round_number in range(MAX_UPLOAD_ROUNDS):
+        if round_number:
+            time.sleep(2 ** round_number)
+        
+        batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(lambda batch: upload_batch(search_client, batch), batches)
+            
+            by_id = {doc["id"]: doc for doc in pending}
+            failed = []
+            for batch_results in results:
+                for result in batch_results:
+                    if result.succeeded:
+                        indexed += 1
+                    else:
+                        failed.append(by_id[result.key])
+        
+        pending = failed
+        if not pending:
+            break
+    
+    return indexed, pending
+
+
+# Embedded batches waiting for upload; bounds memory to a few batches regardless of corpus size
+PIPELINE_QUEUE_SIZE = 4
+
+
+# First markdown H1 line; one scan of the text instead of splitting it into lines
+_TITLE_RE = re.compile(r"(?m)^# (.+)$")
+
+
+def list_markdown_files(folder: Path) -> list:
+    """List the .md files in a folder with one scandir pass (no per-entry stat)."""
+    with os.scandir(folder) as entries:
+        return [Path(entry.path) for entry in entries if entry.name.endswith('.md') and entry.is_file()]
+
+
+def data_manifest_hash(files: list) -> str:
+    """Hash of each product file's name and content, in listing order, to tell whether the data asset changed."""
+    manifest = hashlib.sha256()
+    for path in files:
+        manifest.update(path.name.encode('utf-8') + b":" + hashlib.sha256(path.read_bytes()).digest())
+    return manifest.hexdigest()
+
+
+def read_product_file(path: Path, doc_id: int) -> tuple:
+    """
+    Read a product file as bytes and hash it from the same buffer.
+
+    The hash covers the processing version, embedding model, document id, file name and
+    raw bytes, so decoding can wait until the file is known to have changed. The file name
+    is used rather than the full path, so moving the checkout or building on another machine
+    does not re-embed and re-upload every document.
+
+    Returns:
+        (raw file bytes, content hash)
+    """
+    raw = path.read_bytes()
+    digest = hashlib.sha256(f"{PROCESSING_VERSION}\0{EMBEDDING_MODEL}\0{doc_id}\0{path.name}\0".encode('utf-8'))
+    digest.update(raw)
+    return raw, digest.hexdigest()
+
+
+def build_document(doc_id: int, file_path: Path, content: str, content_hash: str) -> dict:
+    """Build the index document for a product file; contentVector is added once embedded."""
+    # Extract title (first line after #)
+    match = _TITLE_RE.search(content)
+    title = match.group(1).strip() if match else file_path.stem.replace('_', ' ').title()
+    
+    return {
+        "id": str(doc_id),
+        "content": content,
+        "title": title,
+        "filepath": str(file_path),
+        "url": f"file:///{file_path}",
+        "content_hash": content_hash,
+    }
+
+
+def find_indexed_hashes(search_client, hashes: list) -> set:
+    """Return the subset of content hashes already present in the index."""
+    try:
+        results = search_client.search(
+            search_text="*",
+            filter=f"search.in(content_hash, '{','.join(hashes)}', ',')",
+            select=["content_hash"],
+            top=len(hashes)
+        )
+        return {result["content_hash"] for result in results}
+    except HttpResponseError as e:
+        # An index created before content_hash was added cannot be filtered on it; upload everything
+        logger.debug("content hash lookup failed: %s", e)
+        return set()
+
+
+@retry_transient
+async def embed_batch_async(openai_client, texts: list) -> list:
+    """Embed up to EMBEDDING_BATCH_SIZE texts in one request; results keep the input order."""
+    response = await openai_client.embeddings.create(input=texts, model=EMBEDDING_MODEL)
+    return [item.embedding for item in response.data]
+
+
+async def build_batch_async(openai_client, search_client, files: list, first_id: int,
+                            near_duplicates=None) -> tuple:
+    """
+    Read, build and embed one batch of product files, dropping those already indexed unchanged.
+
+    Args:
+        openai_client: AsyncAzureOpenAI client for embeddings
+        search_client: SearchClient for the target index
+        files: Up to EMBEDDING_BATCH_SIZE product file paths
+        first_id: Document id of the first file
+        near_duplicates: Optional NearDuplicateCache consulted for exact-cache misses
+
+    Returns:
+        (changed documents with contentVector set, number of embeddings served from cache,
+        number of unchanged documents skipped)
+    """
+    # Read and hash the files concurrently in worker threads
+    reads = await asyncio.gather(*[
+        asyncio.to_thread(read_product_file, path, first_id + offset) for offset, path in enumerate(files)
+    ])
+    
+    # Files whose hash is already in the index would be rewritten unchanged; they are never decoded
+    indexed_hashes = await asyncio.to_thread(
+        find_indexed_hashes, search_client, [content_hash for _, content_hash in reads]
+    )
+    changed = [j for j, (_, content_hash) in enumerate(reads) if content_hash not in indexed_hashes]
+    skipped = len(files) - len(changed)
+    if not changed:
+        return [], 0, skipped
+    
+    documents = [
+        build_document(first_id + j, files[j], reads[j][0].decode('utf-8'), reads[j][1])
+        for j in changed
+    ]
+    files = [files[j] for j in changed]
+    texts = [truncate_tokens(doc["content"], EMBEDDING_MAX_TOKENS, EMBEDDING_MODEL) for doc in documents]
+    
+    # Reuse cached embeddings for unchanged files and embed the rest in one request
+    vectors, missing = find_uncached_texts(EMBEDDING_MODEL, texts)
+    signatures = {}
+    if missing and near_duplicates is not None:
+        # Near-identical texts (shared boilerplate, a changed price) borrow an existing embedding
+        still_missing = []
+        for j in missing:
+            signatures[j] = minhash_signature(texts[j])
+            vectors[j] = near_duplicates.lookup(signatures[j])
+            if vectors[j] is None:
+                still_missing.append(j)
+        missing = still_missing
+    if missing:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("embed %s", ", ".join(files[j].name for j in missing))
+        embeddings = await embed_batch_async(openai_client, [texts[j] for j in missing])
+        for j, embedding in zip(missing, embeddings):
+            vectors[j] = embedding
+            store_embedding(EMBEDDING_MODEL, texts[j], embedding)
+            if near_duplicates is not None:
+                near_duplicates.add(signatures[j], embedding)
+    
+    # Unit-length vectors let the index rank by dot product, which matches cosine without the norms
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+    for doc, vector in zip(documents, matrix.tolist()):
+        doc["contentVector"] = vector
+    return documents, len(texts) - len(missing), skipped
+
+
+async def index_documents_async(search_client, product_files: list) -> dict:
+    """
+    Stream product files through embedding and upload.
+
+    Producers build and embed batches of EMBEDDING_BATCH_SIZE files, up to
+    MAX_EMBEDDING_CONCURRENCY at once, and hand them to a bounded queue. A single
+    consumer uploads whatever is queued as soon as it arrives, so uploads overlap
+    with embedding and only a few batches are held in memory.
+
+    Args:
+        search_client: SearchClient for the target index
+        product_files: Product markdown files to index
+
+    Returns:
+        Counts of indexed, cached and unchanged (skipped) documents, and the documents
+        that failed to upload
+    """
+    queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    batch_starts = iter(range(0, len(product_files), EMBEDDING_BATCH_SIZE))
+    stats = {"indexed": 0, "cached": 0, "skipped": 0, "failed": []}
+    near_duplicates = get_near_duplicate_cache(EMBEDDING_MODEL)
+    
+    # Shares the pooled HTTP/2 client, so it is not closed here
+    openai_client = AsyncAzureOpenAI(
+        azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
+        api_key=os.getenv('AZURE_OPENAI_API_KEY'),
+        api_version=os.getenv('AZURE_OPENAI_API_VERSION'),
+        http_client=async_http_client(),
+        max_retries=0  # Retries are handled by retry_transient with jittered backoff
+    )
+    
+    async def produce():
+        for start in batch_starts:
+            files = product_files[start:start + EMBEDDING_BATCH_SIZE]
+            documents, cached, skipped = await build_batch_async(
+                openai_client, search_client, files, start + 1, near_duplicates
+            )
+            stats["cached"] += cached
+            stats["skipped"] += skipped
+            if documents:
+                await queue.put(documents)
+    
+    async def consume():
+        while True:
+            documents = await queue.get()
+            if documents is None:
+                return
+            # Take everything already waiting so each upload request carries more documents
+            while not queue.empty() and len(documents) < UPLOAD_BATCH_SIZE:
+                more = queue.get_nowait()
+                if more is None:
+                    queue.put_nowait(None)
+                    break
+                documents.extend(more)
+            
+            indexed, failed = await asyncio.to_thread(upload_in_batches, search_client, documents)
+            stats["indexed"] += indexed
+            stats["failed"].extend(failed)
+            logger.info("  %d/%d documents up to date", stats["indexed"] + stats["skipped"], len(product_files))
+    
+    async def produce_all():
+        await asyncio.gather(*[produce() for _ in range(MAX_EMBEDDING_CONCURRENCY)])
+        await queue.put(None)
+    
+    # A failure on either side propagates at once; asyncio.run cancels the other side
+    await asyncio.gather(produce_all(), consume())
+    
+    if near_duplicates is not None:
+        near_duplicates.save()
+    return stats
+
+
 class OutlanderCopilotBuilder:
     """Builds and deploys the Outlander Gear Co. copilot programmatically."""
     
@@ -35,64 +389,86 @@ class OutlanderCopilotBuilder:
         self.search_endpoint = os.getenv('AZURE_SEARCH_ENDPOINT')
         self.search_key = os.getenv('AZURE_SEARCH_API_KEY')
         self.search_index_name = os.getenv('AZURE_SEARCH_INDEX_NAME', 'outlander-products-index')
+        self.data_path = Path(__file__).parent.parent / "data" / "product-info"
+        self._product_files = None
+        self.transport = build_sdk_transport()
+        # One credential for every AAD client; it caches the token it acquires, so the
+        # credential chain and token request run once per run instead of once per client
+        self.credential = DefaultAzureCredential(exclude_interactive_browser_credential=True)
         
         # Initialize ML Client for Azure AI
         self.ml_client = MLClient(
-            DefaultAzureCredential(),
+            self.credential,
             self.subscription_id,
             self.resource_group,
-            workspace_name=self.project_name
+            workspace_name=self.project_name,
+            transport=self.transport
         )
         
         # Initialize Search Client
         self.search_index_client = SearchIndexClient(
             endpoint=self.search_endpoint,
-            credential=AzureKeyCredential(self.search_key)
+            credential=AzureKeyCredential(self.search_key),
+            transport=self.transport
         )
         
-        print("✓ Azure clients initialized successfully")
+        logger.info("✓ Azure clients initialized successfully")
+    
+    def _get_product_files(self) -> list:
+        """List the product files once per run, sorted so document ids are stable across runs."""
+        if self._product_files is None:
+            self._product_files = sorted(list_markdown_files(self.data_path))
+        return self._product_files
     
     def step1_upload_data(self):
         """Step 1: Upload product data to Azure AI"""
-        print("\n" + "="*80)
-        print("STEP 1: Uploading Product Data")
-        print("="*80)
+        logger.info("\n" + "=" * 80)
+        logger.info("STEP 1: Uploading Product Data")
+        logger.info("=" * 80)
         
-        data_path = Path(__file__).parent.parent / "data" / "product-info"
+        data_path = self.data_path
         
         if not data_path.exists():
-            print("✗ Product data folder not found!")
+            logger.error("✗ Product data folder not found!")
             return False
         
-        product_files = list(data_path.glob("*.md"))
-        print(f"Found {len(product_files)} product files")
+        product_files = self._get_product_files()
+        logger.info("Found %d product files", len(product_files))
         
         # Upload data to Azure AI ML
         try:
-            from azure.ai.ml.entities import Data
-            from azure.ai.ml.constants import AssetTypes
+            # The latest asset version is tagged with the manifest it was uploaded from
+            manifest_hash = data_manifest_hash(product_files)
+            try:
+                existing = self.ml_client.data.get(name="outlander-product-data", label="latest")
+            except ResourceNotFoundError:
+                existing = None
+            if existing is not None and (existing.tags or {}).get("manifest") == manifest_hash:
+                logger.info("✓ Product data unchanged since the last upload, skipping")
+                return True
             
             data_asset = Data(
                 name="outlander-product-data",
                 path=str(data_path),
                 type=AssetTypes.URI_FOLDER,
                 description="Outlander Gear Co. product information",
+                tags={"manifest": manifest_hash},
             )
             
-            print("Uploading data to Azure AI...")
+            logger.info("Uploading data to Azure AI...")
             self.ml_client.data.create_or_update(data_asset)
-            print("✓ Data uploaded successfully")
+            logger.info("✓ Data uploaded successfully")
             return True
             
         except Exception as e:
-            print(f"✗ Error uploading data: {str(e)}")
+            logger.error("✗ Error uploading data: %s", e)
             return False
     
     def step2_create_search_index(self):
         """Step 2: Create AI Search index with vector search"""
-        print("\n" + "="*80)
-        print("STEP 2: Creating AI Search Index")
-        print("="*80)
+        logger.info("\n" + "=" * 80)
+        logger.info("STEP 2: Creating AI Search Index")
+        logger.info("=" * 80)
         
         try:
             # Define the index schema
@@ -124,6 +500,11 @@ class OutlanderCopilotBuilder:
                     type=SearchFieldDataType.String,
                     filterable=True,
                 ),
+                SearchField(
+                    name="content_hash",
+                    type=SearchFieldDataType.String,
+                    filterable=True,
+                ),
                 SearchField(
                     name="contentVector",
                     type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
@@ -133,16 +514,33 @@ class OutlanderCopilotBuilder:
                 ),
             ]
             
-            # Configure vector search
+            # Configure vector search; vectors are scalar-quantized to int8 in the index,
+            # which quarters the HNSW graph's vector memory while queries keep sending float32
             vector_search = VectorSearch(
                 profiles=[
                     VectorSearchProfile(
                         name="myHnswProfile",
                         algorithm_configuration_name="myHnsw",
+                        compression_name="sq-int8",
                     )
                 ],
+                # Sized for a catalogue of hundreds of documents: a denser graph (m=8, the service
+                # allows 4-10) keeps recall up while far smaller beam widths than the defaults
+                # (efConstruction=400, efSearch=500) cut build time and per-query distance computations.
+                # Document vectors are normalized at index time, so dot product ranks exactly as cosine
                 algorithms=[
-                    HnswAlgorithmConfiguration(name="myHnsw")
+                    HnswAlgorithmConfiguration(
+                        name="myHnsw",
+                        parameters=HnswParameters(
+                            m=8,
+                            ef_construction=200,
+                            ef_search=100,
+                            metric=VectorSearchAlgorithmMetric.DOT_PRODUCT,
+                        ),
+                    )
+                ],
+                compressions=[
+                    ScalarQuantizationCompression(compression_name="sq-int8")
                 ],
             )
             
@@ -153,191 +551,160 @@ class OutlanderCopilotBuilder:
                 vector_search=vector_search,
             )
             
-            print(f"Creating index: {self.search_index_name}")
+            logger.info("Creating index: %s", self.search_index_name)
             result = self.search_index_client.create_or_update_index(index)
-            print(f"✓ Index created successfully: {result.name}")
+            logger.info("✓ Index created successfully: %s", result.name)
             return True
             
         except Exception as e:
-            print(f"✗ Error creating index: {str(e)}")
+            logger.error("✗ Error creating index: %s", e)
             return False
     
     def step3_index_documents(self):
         """Step 3: Index product documents into AI Search"""
-        print("\n" + "="*80)
-        print("STEP 3: Indexing Product Documents")
-        print("="*80)
+        logger.info("\n" + "=" * 80)
+        logger.info("STEP 3: Indexing Product Documents")
+        logger.info("=" * 80)
         
         try:
-            from azure.search.documents import SearchClient
-            from openai import AzureOpenAI
-            
-            # Initialize OpenAI client for embeddings
-            openai_client = AzureOpenAI(
-                azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
-                api_key=os.getenv('AZURE_OPENAI_API_KEY'),
-                api_version=os.getenv('AZURE_OPENAI_API_VERSION')
-            )
-            
             # Initialize search client for uploading documents
             search_client = SearchClient(
                 endpoint=self.search_endpoint,
                 index_name=self.search_index_name,
-                credential=AzureKeyCredential(self.search_key)
+                credential=AzureKeyCredential(self.search_key),
+                transport=self.transport
             )
             
-            # Read product files
-            data_path = Path(__file__).parent.parent / "data" / "product-info"
-            product_files = list(data_path.glob("*.md"))
+            # Product files listed by step 1 (or listed now if step 1 was skipped)
+            product_files = self._get_product_files()
             
-            documents = []
-            print(f"Processing {len(product_files)} product files...")
+            # Read, embed and upload in overlapping batches; files already indexed unchanged are skipped
+            logger.info("Processing %d product files...", len(product_files))
+            stats = asyncio.run(index_documents_async(search_client, product_files))
+            logger.info("  %d unchanged documents skipped", stats["skipped"])
+            logger.info("  %d embeddings served from cache", stats["cached"])
             
-            for i, file_path in enumerate(product_files, 1):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Extract title (first line after #)
-                title = file_path.stem.replace('_', ' ').title()
-                lines = content.split('\n')
-                for line in lines:
-                    if line.startswith('# '):
-                        title = line.replace('# ', '').strip()
-                        break
-                
-                # Generate embedding
-                print(f"  Generating embedding for {file_path.name}...")
-                embedding_response = openai_client.embeddings.create(
-                    input=content[:8000],  # Limit content size
-                    model="text-embedding-ada-002"
-                )
-                embedding = embedding_response.data[0].embedding
-                
-                # Create document
-                doc = {
-                    "id": str(i),
-                    "content": content,
-                    "title": title,
-                    "filepath": str(file_path),
-                    "url": f"file:///{file_path}",
-                    "contentVector": embedding,
-                }
-                documents.append(doc)
-            
-            # Upload documents
-            print(f"\nUploading {len(documents)} documents to search index...")
-            result = search_client.upload_documents(documents=documents)
-            print(f"✓ Indexed {len(result)} documents successfully")
+            if stats["failed"]:
+                logger.error("✗ Indexed %d documents; %d failed: %s", stats["indexed"], len(stats["failed"]),
+                         ", ".join(doc["id"] for doc in stats["failed"]))
+                return False
+            logger.info("✓ Indexed %d documents successfully", stats["indexed"])
             return True
             
         except Exception as e:
-            print(f"✗ Error indexing documents: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("✗ Error indexing documents: %s", e)
             return False
     
     def step4_create_prompt_flow(self):
         """Step 4: Create Prompt Flow for the copilot"""
-        print("\n" + "="*80)
-        print("STEP 4: Creating Prompt Flow")
-        print("="*80)
+        logger.info("\n" + "=" * 80)
+        logger.info("STEP 4: Creating Prompt Flow")
+        logger.info("=" * 80)
         
         flow_path = Path(__file__).parent.parent / "prompt_flows" / "outlander_copilot"
         flow_path.mkdir(parents=True, exist_ok=True)
         
         # Create flow.dag.yaml
-        flow_dag = f"""$schema: https://azuremlschemas.azureedge.net/promptflow/latest/Flow.schema.json
-name: outlander_ai_copilot
-display_name: Outlander AI Copilot
-type: chat
-description: AI Copilot for Outlander Gear Co. product assistance
-
-inputs:
-  chat_input:
-    type: string
-    default: "How much do the TrailWalker Hiking Shoes cost?"
-  chat_history:
-    type: list
-    default: []
-
-outputs:
-  answer:
-    type: string
-    reference: ${{generate_response.output}}
-
-nodes:
-- name: search_products
-  type: python
-  source:
-    type: code
-    path: search_products.py
-  inputs:
-    question: ${{{{inputs.chat_input}}}}
-    index_name: {self.search_index_name}
-    search_endpoint: {self.search_endpoint}
-    search_key: {self.search_key}
-
-- name: generate_response
-  type: llm
-  source:
-    type: code
-    path: generate_response.jinja2
-  inputs:
-    deployment_name: {os.getenv('AZURE_DEPLOYMENT_NAME')}
-    question: ${{{{inputs.chat_input}}}}
-    context: ${{{{search_products.output}}}}
-    chat_history: ${{{{inputs.chat_history}}}}
-  connection: azure_openai_connection
-  api: chat
-"""
+        flow_dag = {
+            "$schema": "https://azuremlschemas.azureedge.net/promptflow/latest/Flow.schema.json",
+            "name": "outlander_ai_copilot",
+            "display_name": "Outlander AI Copilot",
+            "type": "chat",
+            "description": "AI Copilot for Outlander Gear Co. product assistance",
+            "inputs": {
+                "chat_input": {
+                    "type": "string",
+                    "default": "How much do the TrailWalker Hiking Shoes cost?",
+                },
+                "chat_history": {
+                    "type": "list",
+                    "default": [],
+                },
+            },
+            "outputs": {
+                "answer": {
+                    "type": "string",
+                    "reference": "${generate_response.output}",
+                },
+            },
+            "nodes": [
+                {
+                    "name": "search_products",
+                    "type": "python",
+                    "source": {"type": "code", "path": "search_products.py"},
+                    "inputs": {
+                        "question": "${inputs.chat_input}",
+                        "index_name": self.search_index_name,
+                        "search_endpoint": self.search_endpoint,
+                        "search_key": self.search_key,
+                    },
+                },
+                {
+                    "name": "generate_response",
+                    "type": "llm",
+                    "source": {"type": "code", "path": "generate_response.jinja2"},
+                    "inputs": {
+                        "deployment_name": os.getenv('AZURE_DEPLOYMENT_NAME'),
+                        "question": "${inputs.chat_input}",
+                        "context": "${search_products.output}",
+                        "chat_history": "${inputs.chat_history}",
+                    },
+                    "connection": "azure_openai_connection",
+                    "api": "chat",
+                },
+            ],
+        }
         
+        # safe_dump quotes values that would corrupt hand-built YAML, e.g. a key containing ':' or '#'
         with open(flow_path / "flow.dag.yaml", 'w') as f:
-            f.write(flow_dag)
+            yaml.safe_dump(flow_dag, f, default_flow_style=False, sort_keys=False)
         
-        print(f"✓ Prompt Flow created at: {flow_path}")
+        logger.info("✓ Prompt Flow created at: %s", flow_path)
         return True
     
     def step5_test_flow(self):
         """Step 5: Test the Prompt Flow locally"""
-        print("\n" + "="*80)
-        print("STEP 5: Testing Prompt Flow")
-        print("="*80)
+        logger.info("\n" + "=" * 80)
+        logger.info("STEP 5: Testing Prompt Flow")
+        logger.info("=" * 80)
         
         try:
-            from promptflow import PFClient
+            if PFClient is None:
+                raise ImportError("promptflow is not installed")
             
             pf_client = PFClient()
             flow_path = Path(__file__).parent.parent / "prompt_flows" / "outlander_copilot"
             
             # Test with sample question
             test_question = "How much do the TrailWalker Hiking Shoes cost?"
-            print(f"Testing with question: '{test_question}'")
+            logger.info("Testing with question: '%s'", test_question)
             
             result = pf_client.test(
                 flow=str(flow_path),
                 inputs={"chat_input": test_question, "chat_history": []}
             )
             
-            print(f"✓ Flow test successful!")
-            print(f"Response: {result.get('answer', 'No response')}")
+            logger.info("✓ Flow test successful!")
+            logger.info("Response: %s", result.get('answer', 'No response'))
             return True
             
         except Exception as e:
-            print(f"⚠ Flow testing will be done after deployment")
-            print(f"  Reason: {str(e)}")
+            logger.warning("⚠ Flow testing will be done after deployment")
+            logger.warning("  Reason: %s", e)
             return True  # Don't fail the process
     
     def step6_deploy(self):
         """Step 6: Deploy the Prompt Flow"""
-        print("\n" + "="*80)
-        print("STEP 6: Deploying Prompt Flow")
-        print("="*80)
+        logger.info("\n" + "=" * 80)
+        logger.info("STEP 6: Deploying Prompt Flow")
+        logger.info("=" * 80)
         
         try:
-            from promptflow.azure import PFClient
+            if AzurePFClient is None:
+                raise ImportError("promptflow-azure is not installed")
             
-            pf_client = PFClient(
-                credential=DefaultAzureCredential(),
+            pf_client = AzurePFClient(
+                credential=self.credential,
                 subscription_id=self.subscription_id,
                 resource_group_name=self.resource_group,
                 workspace_name=self.project_name
@@ -345,7 +712,7 @@ nodes:
             
             flow_path = Path(__file__).parent.parent / "prompt_flows" / "outlander_copilot"
             
-            print("Creating deployment...")
+            logger.info("Creating deployment...")
             deployment = pf_client.deployments.create_or_update(
                 deployment_name="outlander-copilot-deployment",
                 flow=str(flow_path),
@@ -353,20 +720,20 @@ nodes:
                 instance_count=1,
             )
             
-            print(f"✓ Deployment created: {deployment.name}")
-            print(f"  Endpoint: {deployment.endpoint}")
+            logger.info("✓ Deployment created: %s", deployment.name)
+            logger.info("  Endpoint: %s", deployment.endpoint)
             return True
             
         except Exception as e:
-            print(f"✗ Error deploying: {str(e)}")
-            print("  You can deploy manually from Azure AI Foundry portal")
+            logger.error("✗ Error deploying: %s", e)
+            logger.error("  You can deploy manually from Azure AI Foundry portal")
             return False
     
     def run_complete_setup(self):
         """Run all steps in sequence"""
-        print("\n" + "="*80)
-        print("OUTLANDER GEAR CO. - AUTOMATED COPILOT SETUP")
-        print("="*80)
+        logger.info("\n" + "=" * 80)
+        logger.info("OUTLANDER GEAR CO. - AUTOMATED COPILOT SETUP")
+        logger.info("=" * 80)
         
         steps = [
             ("Upload Data", self.step1_upload_data),
@@ -383,33 +750,32 @@ nodes:
                 success = step_func()
                 results.append((step_name, success))
                 if not success:
-                    print(f"\n⚠ {step_name} encountered issues. Continue? (y/n): ", end='')
-                    response = input().lower()
+                    response = input(f"\n⚠ {step_name} encountered issues. Continue? (y/n): ").lower()
                     if response != 'y':
                         break
             except Exception as e:
-                print(f"\n✗ Error in {step_name}: {str(e)}")
+                logger.error("\n✗ Error in %s: %s", step_name, e)
                 results.append((step_name, False))
         
         # Summary
-        print("\n" + "="*80)
-        print("SETUP SUMMARY")
-        print("="*80)
+        logger.info("\n" + "=" * 80)
+        logger.info("SETUP SUMMARY")
+        logger.info("=" * 80)
         for step_name, success in results:
             status = "✓ PASSED" if success else "✗ FAILED"
-            print(f"{status} - {step_name}")
+            logger.info("%s - %s", status, step_name)
         
-        print("\n" + "="*80)
+        logger.info("\n" + "=" * 80)
 
 def main():
     """Main entry point"""
+    # Plain messages on stdout, so status lines stay in order with the interactive prompts
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(message)s", stream=sys.stdout)
     try:
         builder = OutlanderCopilotBuilder()
         builder.run_complete_setup()
     except Exception as e:
-        print(f"\n✗ Fatal error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("\n✗ Fatal error: %s", e)
         sys.exit(1)
 
 if __name__ == "__main__":
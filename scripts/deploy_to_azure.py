@@ -2,7 +2,7 @@
 Deploy Outlander Copilot Prompt Flow to Azure as a Managed Online Endpoint
 """
 import os
-import json
+import orjson
 from pathlib import Path
 from dotenv import load_dotenv
 from azure.ai.ml import MLClient
@@ -154,8 +154,7 @@ def deploy_flow():
         }
         
         output_file = project_root / "deployment_info.json"
-        with open(output_file, 'w') as f:
-            json.dump(deployment_info, f, indent=2)
+        output_file.write_bytes(orjson.dumps(deployment_info, option=orjson.OPT_INDENT_2))
         
         print(f"\n✓ Deployment info saved to: {output_file}")
         
@@ -1,15 +1,21 @@
 """
 Run copilot on existing evaluation dataset and evaluate with GPT-4o judge
 """
-import json
+import asyncio
+import hashlib
+import orjson
 import os
 import sys
+from functools import lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
+import diskcache
 
-# Add project root to path
+# Add project root to path; shared helpers are imported as utils.*, the same module
+# path the flow nodes use, so each helper module is loaded once per process
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
+sys.path.insert(0, str(project_root / "prompt_flows"))
 
 # Load environment variables
 load_dotenv(project_root / ".env")
@@ -17,44 +23,151 @@ load_dotenv(project_root / ".env")
 from promptflow.client import PFClient
 from promptflow.core import Prompty
 
+from prompt_flows.outlander_evaluation.calculate_score import calculate_score
+from prompt_flows.outlander_evaluation.evaluate_metrics import EVAL_SYSTEM_PROMPT, build_batch_request, parse_evaluation
+from utils.batch_api import run_chat_batch
+from utils.embedding_cache import EMBEDDING_BATCH_SIZE
+from utils.semantic_cache import canonicalize, get_semantic_cache
 
-def run_copilot_flow(question: str, chat_history: list = None) -> str:
+_COPILOT_FLOW = str(project_root / "prompt_flows" / "outlander_copilot")
+_EVAL_FLOW = str(project_root / "prompt_flows" / "outlander_evaluation")
+
+# Maximum number of test cases in flight at once; size to the Azure OpenAI RPM/TPM quota
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "8"))
+
+# Datasets at least this large are judged through the Azure OpenAI Batch API (50% cost, 24h window)
+BATCH_API_MIN_CASES = int(os.getenv("BATCH_API_MIN_CASES", "200"))
+
+
+def copilot_fingerprint() -> str:
+    """
+    Short hash of everything that shapes a copilot answer: the flow's source files and prompts,
+    the chat deployment and the search index.
+    
+    Answers cached under one fingerprint are never served once the flow, deployment or index
+    changes, so an evaluation run always measures the current copilot.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(Path(_COPILOT_FLOW).glob("*")):
+        if path.suffix in (".py", ".yaml", ".jinja2", ".prompty"):
+            digest.update(path.name.encode('utf-8') + b"\0" + path.read_bytes() + b"\0")
+    for var in ("AZURE_DEPLOYMENT_NAME", "AZURE_SEARCH_INDEX_NAME"):
+        digest.update((os.getenv(var) or "").encode('utf-8') + b"\0")
+    return digest.hexdigest()[:16]
+
+
+# Answers for paraphrased questions (enabled with SEMANTIC_CACHE=1), namespaced by the
+# copilot fingerprint so answers from an older flow, deployment or index are not reused
+_ANSWER_CACHE = get_semantic_cache(f"copilot_answers_{copilot_fingerprint()}", env_prefix="SEMANTIC_CACHE")
+
+# Judge verdicts for exact repeats of (question, ground truth, prediction, context); disabled with LLM_CACHE=0
+JUDGE_CACHE_DIR = Path(os.getenv("JUDGE_CACHE_DIR", project_root / ".llm_cache" / "judge"))
+_JUDGE_CACHE_ENABLED = os.getenv('LLM_CACHE', '1') != '0'
+_judge_cache = None
+
+# Judge deployments, read once; the batch deployment falls back to the live one
+JUDGE_DEPLOYMENT = os.getenv("AZURE_DEPLOYMENT_NAME")
+JUDGE_BATCH_DEPLOYMENT = os.getenv("AZURE_BATCH_DEPLOYMENT_NAME", JUDGE_DEPLOYMENT)
+
+# Part of every judge cache key, so editing the rubric invalidates the stored verdicts
+_RUBRIC_HASH = hashlib.sha256(EVAL_SYSTEM_PROMPT.encode('utf-8')).hexdigest()
+
+
+def _get_judge_cache():
+    """Open the judge cache on first use; returns None when disabled with LLM_CACHE=0."""
+    global _judge_cache
+    if not _JUDGE_CACHE_ENABLED:
+        return None
+    if _judge_cache is None:
+        _judge_cache = diskcache.Cache(str(JUDGE_CACHE_DIR))
+    return _judge_cache
+
+
+def judge_cache_key(question: str, ground_truth: str, prediction: str, context: str,
+                    deployment: str = JUDGE_DEPLOYMENT) -> str:
+    """SHA-256 over the judge deployment that produces the verdict, the rubric and the evaluation inputs."""
+    payload = orjson.dumps({
+        "model": deployment,
+        "rubric": _RUBRIC_HASH,
+        "q": question,
+        "gt": ground_truth,
+        "pred": prediction,
+        "ctx": context
+    }, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(payload).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _pf() -> PFClient:
+    """One PFClient per process, shared by every flow run."""
+    return PFClient()
+
+
+def run_copilot_flow(question: str, chat_history: list = None, question_embedding=None) -> str:
     """
     Run the outlander copilot flow and return the answer.
     
     Args:
         question: User's question
         chat_history: Optional chat history
+        question_embedding: Answer-cache embedding of the question, if already computed in a batch
         
     Returns:
         Generated answer from the copilot
     """
-    pf = PFClient()
+    # A near-identical question already answered skips the flow; follow-ups depend on
+    # their history, so only standalone questions are cached. The cache is only an
+    # optimization: if it fails, the question goes to the flow as if it were disabled
+    cache_embedding = None
+    if _ANSWER_CACHE is not None and not chat_history:
+        try:
+            cache_embedding = question_embedding
+            if cache_embedding is None:
+                cache_embedding = _ANSWER_CACHE.embed(canonicalize(question))
+            cached = _ANSWER_CACHE.lookup(cache_embedding)
+            if cached is not None:
+                return cached["answer"]
+        except Exception as e:
+            print(f"Answer cache lookup failed, running the copilot: {e}")
+            cache_embedding = None
     
-    flow_path = project_root / "prompt_flows" / "outlander_copilot"
+    answer = _invoke_copilot_flow(question, chat_history)
     
+    if cache_embedding is not None and not answer.startswith("Error:"):
+        try:
+            _ANSWER_CACHE.insert(cache_embedding, {"answer": answer})
+        except Exception as e:
+            print(f"Answer cache insert failed: {e}")
+    return answer
+
+
+def _invoke_copilot_flow(question: str, chat_history: list = None) -> str:
+    """Run the copilot flow through PFClient; errors come back as an "Error: ..." answer."""
     try:
-        result = pf.flows.test(
-            flow=str(flow_path),
+        result = _pf().flows.test(
+            flow=_COPILOT_FLOW,
             inputs={
                 "chat_input": question,
                 "chat_history": chat_history or []
             }
         )
         
-        # Extract answer from result
-        if hasattr(result, 'answer'):
-            return result.answer
-        elif isinstance(result, dict) and 'answer' in result:
-            return result['answer']
-        else:
-            return str(result)
+        # flows.test returns the flow outputs as a dict; the attribute lookup covers run objects
+        answer = result.get('answer') if isinstance(result, dict) else getattr(result, 'answer', None)
+        return answer if answer is not None else str(result)
             
     except Exception as e:
         print(f"Error running copilot: {e}")
         return f"Error: {str(e)}"
 
 
+def skipped_evaluation(prediction: str):
+    """Zero-score result for an empty or failed prediction, which is not worth a judge call; None otherwise."""
+    if not prediction or prediction.startswith("Error:"):
+        return {"evaluation_result": {"skipped": "prediction_error"}, "overall_score": 0.0}
+    return None
+
+
 def run_evaluation_flow(question: str, ground_truth: str, prediction: str, context: str = "") -> dict:
     """
     Run the evaluation flow to score a prediction.
@@ -68,13 +181,31 @@ def run_evaluation_flow(question: str, ground_truth: str, prediction: str, conte
     Returns:
         Dictionary with evaluation_result and overall_score
     """
-    pf = PFClient()
+    skipped = skipped_evaluation(prediction)
+    if skipped is not None:
+        return skipped
+    
+    # Re-runs over a stable dataset return the stored verdict without running the flow
+    cache = _get_judge_cache()
+    key = judge_cache_key(question, ground_truth, prediction, context)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
     
-    flow_path = project_root / "prompt_flows" / "outlander_evaluation"
+    evaluation = _invoke_evaluation_flow(question, ground_truth, prediction, context)
     
+    # Failed evaluations are not cached, so the next run tries them again
+    if cache is not None and "error" not in evaluation["evaluation_result"]:
+        cache.set(key, evaluation)
+    return evaluation
+
+
+def _invoke_evaluation_flow(question: str, ground_truth: str, prediction: str, context: str = "") -> dict:
+    """Run the evaluation flow through PFClient; errors come back as a zero-score result."""
     try:
-        result = pf.flows.test(
-            flow=str(flow_path),
+        result = _pf().flows.test(
+            flow=_EVAL_FLOW,
             inputs={
                 "question": question,
                 "ground_truth": ground_truth,
@@ -83,23 +214,15 @@ def run_evaluation_flow(question: str, ground_truth: str, prediction: str, conte
             }
         )
         
-        # Parse the result
-        if isinstance(result, dict):
-            eval_result = result.get('evaluation_result', '{}')
-            overall_score = result.get('overall_score', '0.0')
-        else:
-            eval_result = '{}'
-            overall_score = '0.0'
-        
-        # Parse JSON strings if needed
-        if isinstance(eval_result, str):
-            eval_result = json.loads(eval_result)
-        if isinstance(overall_score, str):
-            overall_score = float(overall_score)
-            
+        # The flow's outputs are typed object and number, so they arrive already parsed;
+        # a flow still declaring a string output hands back JSON, which orjson takes as str or bytes
+        outputs = result if isinstance(result, dict) else {}
+        eval_result = outputs.get('evaluation_result', {})
+        if isinstance(eval_result, (str, bytes)):
+            eval_result = orjson.loads(eval_result)
         return {
             "evaluation_result": eval_result,
-            "overall_score": overall_score
+            "overall_score": float(outputs.get('overall_score', 0.0))
         }
         
     except Exception as e:
@@ -110,9 +233,266 @@ def run_evaluation_flow(question: str, ground_truth: str, prediction: str, conte
         }
 
 
-def main():
+async def arun_copilot_flow(question: str, chat_history: list = None, question_embedding=None) -> str:
+    """Run the copilot flow in a worker thread so several cases can be in flight at once."""
+    return await asyncio.to_thread(run_copilot_flow, question, chat_history, question_embedding)
+
+
+async def arun_evaluation_flow(question: str, ground_truth: str, prediction: str, context: str = "") -> dict:
+    """Run the evaluation flow in a worker thread so several cases can be in flight at once."""
+    return await asyncio.to_thread(run_evaluation_flow, question, ground_truth, prediction, context)
+
+
+def submit_judge_batch(cases: list, batch_file: Path) -> list:
+    """
+    Judge every prediction in a single Azure OpenAI Batch API job.
+    
+    Args:
+        cases: (question, ground_truth, prediction) tuples
+        batch_file: Where to write the batch input JSONL
+        
+    Returns:
+        One dictionary with evaluation_result and overall_score per case, in order
+    """
+    # Skipped predictions and verdicts already in the judge cache never reach the batch job
+    cache = _get_judge_cache()
+    evaluations = [None] * len(cases)
+    keys = {}
+    requests = {}
+    for i, (question, ground_truth, prediction) in enumerate(cases, 1):
+        evaluation = skipped_evaluation(prediction)
+        if evaluation is None and cache is not None:
+            keys[i] = judge_cache_key(question, ground_truth, prediction, "", JUDGE_BATCH_DEPLOYMENT)
+            evaluation = cache.get(keys[i])
+        if evaluation is not None:
+            evaluations[i - 1] = evaluation
+            continue
+        request = build_batch_request(question, ground_truth, prediction)
+        request["model"] = JUDGE_BATCH_DEPLOYMENT
+        requests[f"case-{i}"] = request
+    
+    outputs = run_chat_batch(requests, batch_file) if requests else {}
+    
+    for i in range(1, len(cases) + 1):
+        if evaluations[i - 1] is not None:
+            continue
+        output = outputs[f"case-{i}"]
+        try:
+            if output["error"] is not None:
+                raise RuntimeError(output["error"])
+            eval_result = parse_evaluation(output["content"])
+            evaluation = {
+                "evaluation_result": eval_result,
+                "overall_score": calculate_score(eval_result)
+            }
+        except Exception as e:
+            evaluation = {"evaluation_result": {"error": str(e)}, "overall_score": 0.0}
+        
+        # Same rule as run_evaluation_flow: failed evaluations are not cached
+        if cache is not None and "error" not in evaluation["evaluation_result"]:
+            cache.set(keys[i], evaluation)
+        evaluations[i - 1] = evaluation
+    return evaluations
+
+
+def count_cases(dataset_path: Path) -> int:
+    """Count the dataset's records with one binary pass, without parsing or keeping them."""
+    with open(dataset_path, 'rb') as f:
+        return sum(1 for line in f if line.strip())
+
+
+async def embed_questions(chunk: list) -> list:
+    """
+    Embed the standalone questions of a chunk of cases for the answer cache in one request.
+    
+    Args:
+        chunk: (test number, test case) pairs
+        
+    Returns:
+        One embedding row per case, or None where the cache does not apply
+    """
+    embeddings = [None] * len(chunk)
+    if _ANSWER_CACHE is None:
+        return embeddings
+    positions = [k for k, (_, test_case) in enumerate(chunk) if not test_case.get('chat_history')]
+    if positions:
+        try:
+            matrix = await asyncio.to_thread(
+                _ANSWER_CACHE.embed_many, [canonicalize(chunk[k][1]['chat_input']) for k in positions]
+            )
+        except Exception as e:
+            # Each case falls back to embedding its own question
+            print(f"Error embedding questions: {e}")
+            return embeddings
+        for k, row in zip(positions, matrix):
+            embeddings[k] = row.reshape(1, -1)
+    return embeddings
+
+
+async def for_each_case(dataset_path: Path, handle, skip=frozenset()) -> list:
+    """
+    Stream test cases from the JSONL dataset through MAX_CONCURRENCY workers.
+    
+    A bounded queue sits between the reader and the workers, so only a few parsed
+    cases are held ahead of the work instead of the whole dataset. Cases are read in
+    chunks of EMBEDDING_BATCH_SIZE so the answer cache embeds each chunk's questions
+    in a single request.
+    
+    Args:
+        dataset_path: JSONL dataset, one test case per line
+        handle: Coroutine function called as handle(i, test_case, question_embedding) for each case
+        skip: Test numbers that already have a result and are not run again
+        
+    Returns:
+        The handle results in completion order
+    """
+    queue = asyncio.Queue(maxsize=MAX_CONCURRENCY * 2)
+    outcomes = []
+    
+    async def enqueue(chunk: list):
+        for (i, test_case), embedding in zip(chunk, await embed_questions(chunk)):
+            await queue.put((i, test_case, embedding))
+    
+    async def feed():
+        chunk = []
+        with open(dataset_path, 'rb') as f:
+            i = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                i += 1
+                if i in skip:
+                    continue
+                chunk.append((i, orjson.loads(line)))
+                if len(chunk) == EMBEDDING_BATCH_SIZE:
+                    await enqueue(chunk)
+                    chunk = []
+        if chunk:
+            await enqueue(chunk)
+        for _ in range(MAX_CONCURRENCY):
+            await queue.put(None)
+    
+    async def work():
+        while (item := await queue.get()) is not None:
+            outcomes.append(await handle(*item))
+    
+    await asyncio.gather(feed(), *[work() for _ in range(MAX_CONCURRENCY)])
+    return outcomes
+
+
+async def process_case(test_case: dict, i: int, total: int, question_embedding=None) -> dict:
+    """
+    Run the copilot and then the judge for one test case.
+    
+    Args:
+        test_case: Dataset record with chat_input, truth and optional chat_history
+        i: 1-based test number
+        total: Number of test cases, for progress output
+        question_embedding: Answer-cache embedding of the question, if computed in a batch
+        
+    Returns:
+        Result record for the test case
+    """
+    question = test_case['chat_input']
+    ground_truth = test_case['truth']
+    chat_history = test_case.get('chat_history', [])
+    
+    try:
+        # Step 1: Run copilot to get prediction
+        prediction = await arun_copilot_flow(question, chat_history, question_embedding)
+        
+        # Step 2: Evaluate the prediction
+        evaluation = await arun_evaluation_flow(question, ground_truth, prediction)
+    except Exception as e:
+        print(f"\n[{i}/{total}] Error: {e}")
+        return _error_result(i, test_case, e)
+    
+    return report_case(test_case, i, total, prediction, evaluation)
+
+
+def report_case(test_case: dict, i: int, total: int, prediction: str, evaluation: dict) -> dict:
+    """Print one test case's outcome and build its result record."""
+    question = test_case['chat_input']
+    ground_truth = test_case['truth']
+    eval_result = evaluation['evaluation_result']
+    overall_score = evaluation['overall_score']
+    
+    # One print per case, so the lines of concurrent cases do not interleave
+    lines = [
+        f"\n[{i}/{total}] Question: {question}",
+        f"  → Prediction: {prediction[:100]}..." if len(prediction) > 100 else f"  → Prediction: {prediction}",
+        f"  → Overall Score: {overall_score}/5.0",
+    ]
+    if 'relevance' in eval_result:
+        lines += [
+            f"     - Relevance: {eval_result['relevance']}",
+            f"     - Accuracy: {eval_result['accuracy']}",
+            f"     - Completeness: {eval_result['completeness']}",
+            f"     - Groundedness: {eval_result['groundedness']}",
+            f"     - Fluency: {eval_result['fluency']}",
+        ]
+    print("\n".join(lines))
+    
+    return {
+        "test_number": i,
+        "question": question,
+        "ground_truth": ground_truth,
+        "prediction": prediction,
+        "evaluation": eval_result,
+        "overall_score": overall_score,
+        "status": "success" if overall_score > 0 else "failed"
+    }
+
+
+def write_result(f, record: dict):
+    """Append one result record as a JSONL line and flush it, so finished cases survive a crash."""
+    f.write(orjson.dumps(record) + b"\n")
+    f.flush()
+
+
+def load_completed(results_path: Path) -> dict:
+    """
+    Read the records (results or prediction checkpoints) of an interrupted run so it can be resumed.
+    
+    A line cut short by the crash is truncated from the file, so appended records
+    start on a line of their own.
+    
+    Args:
+        results_path: Results or predictions JSONL written by an earlier run
+        
+    Returns:
+        Dictionary mapping test_number to its result record
+    """
+    data = results_path.read_bytes()
+    complete = data.rfind(b"\n") + 1
+    if complete < len(data):
+        with open(results_path, 'r+b') as f:
+            f.truncate(complete)
+    records = (orjson.loads(line) for line in data[:complete].splitlines() if line.strip())
+    return {record['test_number']: record for record in records}
+
+
+def _error_result(i: int, test_case: dict, error) -> dict:
+    """Build the result record for a test case that raised."""
+    return {
+        "test_number": i,
+        "question": test_case['chat_input'],
+        "ground_truth": test_case['truth'],
+        "prediction": f"Error: {str(error)}",
+        "evaluation": {"error": str(error)},
+        "overall_score": 0.0,
+        "status": "failed"
+    }
+
+
+async def main():
     """
     Main function to run copilot and evaluate responses.
+    
+    Pass --resume <results.jsonl> to continue an interrupted run: cases already in
+    that file are skipped and new results are appended to it. On the Batch API path,
+    copilot answers checkpointed next to it (<results>_predictions.jsonl) are judged
+    without running the copilot again.
     """
     # Paths
     dataset_path = project_root / "evaluation" / "evaluation_dataset.jsonl"
@@ -122,97 +502,148 @@ def main():
     # Generate timestamp for output file
     from datetime import datetime
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_path = output_dir / f"llm_judge_evaluation_{timestamp}.json"
+    
+    args = sys.argv[1:]
+    if "--resume" in args:
+        position = args.index("--resume") + 1
+        if position >= len(args):
+            print("Usage: python scripts/run_copilot_and_evaluate.py [--resume <results.jsonl>]")
+            sys.exit(2)
+        results_path = Path(args[position])
+        if not results_path.is_file():
+            print(f"Cannot resume: results file not found: {results_path}")
+            sys.exit(2)
+        completed = load_completed(results_path)
+    else:
+        results_path = output_dir / f"llm_judge_evaluation_{timestamp}.jsonl"
+        completed = {}
+    # The summary sits next to the results; it holds no per-case records
+    output_path = results_path.with_suffix(".json")
     
     print(f"Loading dataset from: {dataset_path}")
-    print(f"Output will be saved to: {output_path}")
+    print(f"Results will be appended to: {results_path}")
     print("-" * 80)
     
-    # Load dataset
-    test_cases = []
-    with open(dataset_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            test_cases.append(json.loads(line.strip()))
+    # Count the cases up front; the cases themselves are streamed to the workers
+    total = count_cases(dataset_path)
     
-    print(f"Loaded {len(test_cases)} test cases")
+    print(f"Found {total} test cases")
+    if completed:
+        print(f"Resuming: {len(completed)} cases already evaluated")
+    print(f"Running up to {MAX_CONCURRENCY} cases concurrently")
     print("-" * 80)
     
-    # Process each test case
-    results = []
-    total_score = 0.0
+    # Running counters; each record goes to disk as soon as its case finishes
+    pass_threshold = 3.5  # 70%
+    evaluated = len(completed)
+    total_score = sum(record['overall_score'] for record in completed.values())
+    passed = sum(1 for record in completed.values() if record['overall_score'] >= pass_threshold)
+    remaining = total - evaluated
     
-    for i, test_case in enumerate(test_cases, 1):
-        question = test_case['chat_input']
-        ground_truth = test_case['truth']
-        chat_history = test_case.get('chat_history', [])
-        
-        print(f"\n[{i}/{len(test_cases)}] Question: {question}")
-        
-        # Step 1: Run copilot to get prediction
-        print("  → Running copilot...")
-        prediction = run_copilot_flow(question, chat_history)
-        print(f"  → Prediction: {prediction[:100]}..." if len(prediction) > 100 else f"  → Prediction: {prediction}")
-        
-        # Step 2: Evaluate the prediction
-        print("  → Evaluating with GPT-4o judge...")
-        evaluation = run_evaluation_flow(question, ground_truth, prediction)
-        
-        eval_result = evaluation['evaluation_result']
-        overall_score = evaluation['overall_score']
-        
-        print(f"  → Overall Score: {overall_score}/5.0")
-        if 'relevance' in eval_result:
-            print(f"     - Relevance: {eval_result['relevance']}")
-            print(f"     - Accuracy: {eval_result['accuracy']}")
-            print(f"     - Completeness: {eval_result['completeness']}")
-            print(f"     - Groundedness: {eval_result['groundedness']}")
-            print(f"     - Fluency: {eval_result['fluency']}")
+    with open(results_path, 'ab') as f:
+        def record(result: dict):
+            nonlocal evaluated, total_score, passed
+            write_result(f, result)
+            evaluated += 1
+            total_score += result['overall_score']
+            if result['overall_score'] >= pass_threshold:
+                passed += 1
         
-        # Store result
-        result = {
-            "test_number": i,
-            "question": question,
-            "ground_truth": ground_truth,
-            "prediction": prediction,
-            "evaluation": eval_result,
-            "overall_score": overall_score,
-            "status": "success" if overall_score > 0 else "failed"
-        }
-        results.append(result)
-        total_score += overall_score
+        if remaining >= BATCH_API_MIN_CASES:
+            # Large offline runs: collect every prediction, then one discounted judge batch job.
+            # Each prediction is checkpointed as it completes, so a crash or a failed batch job
+            # does not lose the copilot answers; --resume picks them up without re-running them
+            predictions_path = results_path.with_name(f"{results_path.stem}_predictions.jsonl")
+            checkpointed = load_completed(predictions_path) if predictions_path.exists() else {}
+            predictions = [
+                (i, entry['test_case'], entry['prediction'])
+                for i, entry in checkpointed.items() if i not in completed
+            ]
+            
+            with open(predictions_path, 'ab') as checkpoint:
+                async def predict(i: int, test_case: dict, question_embedding) -> tuple:
+                    prediction = await arun_copilot_flow(
+                        test_case['chat_input'], test_case.get('chat_history', []), question_embedding
+                    )
+                    write_result(checkpoint, {"test_number": i, "test_case": test_case, "prediction": prediction})
+                    return i, test_case, prediction
+                
+                predictions += await for_each_case(
+                    dataset_path, predict, skip=completed.keys() | checkpointed.keys()
+                )
+            predictions.sort(key=lambda item: item[0])
+            
+            print(f"\nSubmitting {len(predictions)} predictions to the Azure OpenAI Batch API judge")
+            batch_file = output_dir / f"judge_batch_{timestamp}.jsonl"
+            try:
+                evaluations = await asyncio.to_thread(
+                    submit_judge_batch,
+                    [(test_case['chat_input'], test_case['truth'], prediction) for _, test_case, prediction in predictions],
+                    batch_file
+                )
+            except Exception as e:
+                # A failed, expired or cancelled job: judge the same predictions live instead
+                print(f"\nBatch judge failed: {e}")
+                print(f"Judging {len(predictions)} predictions with the live evaluation flow")
+                evaluations = None
+            
+            if evaluations is not None:
+                for (i, test_case, prediction), evaluation in zip(predictions, evaluations):
+                    record(report_case(test_case, i, total, prediction, evaluation))
+            else:
+                semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+                
+                async def judge(i: int, test_case: dict, prediction: str):
+                    async with semaphore:
+                        try:
+                            evaluation = await arun_evaluation_flow(test_case['chat_input'], test_case['truth'], prediction)
+                        except Exception as e:
+                            print(f"\n[{i}/{total}] Error: {e}")
+                            record(_error_result(i, test_case, e))
+                            return
+                    record(report_case(test_case, i, total, prediction, evaluation))
+                
+                await asyncio.gather(*[judge(*item) for item in predictions])
+        else:
+            # Workers finish out of order, so the JSONL is in completion order; each
+            # record carries its test_number
+            async def handle(i: int, test_case: dict, question_embedding):
+                record(await process_case(test_case, i, total, question_embedding))
+            
+            await for_each_case(dataset_path, handle, skip=completed.keys())
     
     # Calculate summary statistics
-    avg_score = total_score / len(test_cases) if test_cases else 0.0
-    pass_threshold = 3.5  # 70%
-    passed = sum(1 for r in results if r['overall_score'] >= pass_threshold)
-    pass_rate = (passed / len(test_cases)) * 100 if test_cases else 0.0
+    avg_score = total_score / evaluated if evaluated else 0.0
+    pass_rate = (passed / evaluated) * 100 if evaluated else 0.0
     
     # Prepare final output
     output_data = {
         "timestamp": timestamp,
         "dataset": str(dataset_path),
-        "total_questions": len(test_cases),
+        "total_questions": total,
+        "evaluated_questions": evaluated,
         "average_score": round(avg_score, 2),
         "pass_rate": f"{pass_rate:.1f}%",
         "passed_cases": passed,
         "pass_threshold": pass_threshold,
         "evaluation_method": "GPT-4o LLM Judge (5 metrics: relevance, accuracy, completeness, groundedness, fluency)",
-        "results": results
+        "results_file": results_path.name
     }
     
-    # Save results
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+    # Save summary
+    with open(output_path, 'wb') as f:
+        f.write(orjson.dumps(output_data, option=orjson.OPT_INDENT_2))
     
     print("\n" + "=" * 80)
     print("EVALUATION COMPLETE")
     print("=" * 80)
-    print(f"Total test cases: {len(test_cases)}")
+    print(f"Total test cases: {evaluated}/{total}")
     print(f"Average score: {avg_score:.2f}/5.0")
-    print(f"Pass rate (≥{pass_threshold}): {pass_rate:.1f}% ({passed}/{len(test_cases)})")
-    print(f"\nResults saved to: {output_path}")
+    print(f"Pass rate (≥{pass_threshold}): {pass_rate:.1f}% ({passed}/{evaluated})")
+    print(f"\nResults saved to: {results_path}")
+    print(f"Summary saved to: {output_path}")
     print("=" * 80)
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
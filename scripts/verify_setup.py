@@ -3,8 +3,10 @@ Verification and Testing Script for Outlander Gear Co. Copilot
 This script verifies your Azure configuration and tests the GPT-4o deployment.
 """
 
+import io
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import datetime
@@ -16,41 +18,63 @@ YELLOW = '\033[93m'
 BLUE = '\033[94m'
 RESET = '\033[0m'
 
-def print_header(text):
+# Message templates, built once from the color codes
+_HDR_FMT = f"\n{BLUE}{'=' * 80}{RESET}\n{BLUE}%s{RESET}\n{BLUE}{'=' * 80}{RESET}\n\n"
+_OK_FMT = f"{GREEN}✓ %s{RESET}\n"
+_ERR_FMT = f"{RED}✗ %s{RESET}\n"
+_WARN_FMT = f"{YELLOW}⚠ %s{RESET}\n"
+_INFO_FMT = "  %s\n"
+
+# Paths and settings, resolved once
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+_ENV_PATH = _PROJECT_ROOT / ".env"
+_DATA_PATH = _PROJECT_ROOT / "data"
+_EVAL_DATASET_PATH = _PROJECT_ROOT / "evaluation" / "evaluation_dataset.jsonl"
+
+load_dotenv(_ENV_PATH)
+_ENV = {var: os.getenv(var) for var in (
+    'AZURE_OPENAI_ENDPOINT',
+    'AZURE_OPENAI_API_KEY',
+    'AZURE_OPENAI_API_VERSION',
+    'AZURE_DEPLOYMENT_NAME',
+    'AZURE_AI_PROJECT_NAME',
+    'AZURE_SEARCH_SERVICE_NAME',
+    'AZURE_SEARCH_API_KEY',
+)}
+
+def _out(buf):
+    """Write to the given buffer, or to stdout when there is none."""
+    return sys.stdout if buf is None else buf
+
+def print_header(text, buf=None):
     """Print a formatted header."""
-    print(f"\n{BLUE}{'=' * 80}{RESET}")
-    print(f"{BLUE}{text.center(80)}{RESET}")
-    print(f"{BLUE}{'=' * 80}{RESET}\n")
+    _out(buf).write(_HDR_FMT % text.center(80))
 
-def print_success(text):
+def print_success(text, buf=None):
     """Print success message."""
-    print(f"{GREEN}✓ {text}{RESET}")
+    _out(buf).write(_OK_FMT % text)
 
-def print_error(text):
+def print_error(text, buf=None):
     """Print error message."""
-    print(f"{RED}✗ {text}{RESET}")
+    _out(buf).write(_ERR_FMT % text)
 
-def print_warning(text):
+def print_warning(text, buf=None):
     """Print warning message."""
-    print(f"{YELLOW}⚠ {text}{RESET}")
+    _out(buf).write(_WARN_FMT % text)
 
-def print_info(text):
+def print_info(text, buf=None):
     """Print info message."""
-    print(f"  {text}")
+    _out(buf).write(_INFO_FMT % text)
 
-def check_environment_file():
+def check_environment_file(buf=None):
     """Check if .env file exists and is configured."""
-    print_header("STEP 1: Checking Environment Configuration")
+    print_header("STEP 1: Checking Environment Configuration", buf)
     
-    env_path = Path(__file__).parent.parent / ".env"
-    if not env_path.exists():
-        print_error(".env file not found!")
+    if not _ENV_PATH.exists():
+        print_error(".env file not found!", buf)
         return False
     
-    print_success(".env file found")
-    
-    # Load environment variables
-    load_dotenv(env_path)
+    print_success(".env file found", buf)
     
     # Check required variables
     required_vars = {
@@ -63,85 +87,84 @@ def check_environment_file():
     
     all_configured = True
     for var, description in required_vars.items():
-        value = os.getenv(var)
+        value = _ENV[var]
         if value and 'your_' not in value.lower():
-            print_success(f"{description}: Configured")
-            print_info(f"  Value: {value[:50]}..." if len(value) > 50 else f"  Value: {value}")
+            print_success(f"{description}: Configured", buf)
+            print_info(f"  Value: {value[:50]}..." if len(value) > 50 else f"  Value: {value}", buf)
         else:
-            print_warning(f"{description}: NOT configured or placeholder value")
+            print_warning(f"{description}: NOT configured or placeholder value", buf)
             all_configured = False
     
     # Check AI Search Key
-    search_key = os.getenv('AZURE_SEARCH_API_KEY')
+    search_key = _ENV['AZURE_SEARCH_API_KEY']
     if search_key and 'your_' not in search_key.lower():
-        print_success("AI Search API Key: Configured")
+        print_success("AI Search API Key: Configured", buf)
     else:
-        print_warning("AI Search API Key: NOT configured - You need to add this from Azure Portal")
-        print_info("  Go to Azure Portal → AI Search → projectaisearchfree → Keys")
+        print_warning("AI Search API Key: NOT configured - You need to add this from Azure Portal", buf)
+        print_info("  Go to Azure Portal → AI Search → projectaisearchfree → Keys", buf)
         all_configured = False
     
     return all_configured
 
-def check_data_files():
+def check_data_files(buf=None):
     """Check if data files are present."""
-    print_header("STEP 2: Checking Data Files")
-    
-    data_path = Path(__file__).parent.parent / "data"
+    print_header("STEP 2: Checking Data Files", buf)
     
     # Check product-info folder
-    product_info_path = data_path / "product-info"
+    product_info_path = _DATA_PATH / "product-info"
     if product_info_path.exists():
         product_files = list(product_info_path.glob("*.md"))
-        print_success(f"Product data folder found with {len(product_files)} files")
-        print_info(f"  Location: {product_info_path}")
+        print_success(f"Product data folder found with {len(product_files)} files", buf)
+        print_info(f"  Location: {product_info_path}", buf)
     else:
-        print_error("Product data folder not found!")
+        print_error("Product data folder not found!", buf)
         return False
     
     # Check customer-info folder
-    customer_info_path = data_path / "customer-info"
+    customer_info_path = _DATA_PATH / "customer-info"
     if customer_info_path.exists():
         customer_files = list(customer_info_path.glob("*.md"))
-        print_success(f"Customer data folder found with {len(customer_files)} files")
-        print_info(f"  Location: {customer_info_path}")
+        print_success(f"Customer data folder found with {len(customer_files)} files", buf)
+        print_info(f"  Location: {customer_info_path}", buf)
     else:
-        print_warning("Customer data folder not found (optional)")
+        print_warning("Customer data folder not found (optional)", buf)
     
     return True
 
-def check_evaluation_dataset():
+def check_evaluation_dataset(buf=None):
     """Check if evaluation dataset exists."""
-    print_header("STEP 3: Checking Evaluation Dataset")
+    print_header("STEP 3: Checking Evaluation Dataset", buf)
     
-    eval_path = Path(__file__).parent.parent / "evaluation" / "evaluation_dataset.jsonl"
+    eval_path = _EVAL_DATASET_PATH
     if eval_path.exists():
-        with open(eval_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        print_success(f"Evaluation dataset found with {len(lines)} test questions")
-        print_info(f"  Location: {eval_path}")
+        # Count the non-empty lines without decoding them or holding the file in memory
+        with open(eval_path, 'rb') as f:
+            num_questions = sum(1 for line in f if line.strip())
+        print_success(f"Evaluation dataset found with {num_questions} test questions", buf)
+        print_info(f"  Location: {eval_path}", buf)
         return True
     else:
-        print_error("Evaluation dataset not found!")
+        print_error("Evaluation dataset not found!", buf)
         return False
 
-def test_openai_connection():
+def test_openai_connection(buf=None):
     """Test connection to Azure OpenAI."""
-    print_header("STEP 4: Testing Azure OpenAI Connection")
+    print_header("STEP 4: Testing Azure OpenAI Connection", buf)
     
     try:
         from openai import AzureOpenAI
         
-        endpoint = os.getenv('AZURE_OPENAI_ENDPOINT')
-        api_key = os.getenv('AZURE_OPENAI_API_KEY')
-        deployment = os.getenv('AZURE_DEPLOYMENT_NAME')
-        api_version = os.getenv('AZURE_OPENAI_API_VERSION')
+        endpoint = _ENV['AZURE_OPENAI_ENDPOINT']
+        api_key = _ENV['AZURE_OPENAI_API_KEY']
+        deployment = _ENV['AZURE_DEPLOYMENT_NAME']
+        api_version = _ENV['AZURE_OPENAI_API_VERSION']
         
         if not all([endpoint, api_key, deployment]):
-            print_error("Missing OpenAI configuration in .env file")
+            print_error("Missing OpenAI configuration in .env file", buf)
             return False
         
-        print_info(f"Connecting to: {endpoint}")
-        print_info(f"Deployment: {deployment}")
+        print_info(f"Connecting to: {endpoint}", buf)
+        print_info(f"Deployment: {deployment}", buf)
         
         client = AzureOpenAI(
             azure_endpoint=endpoint,
@@ -149,7 +172,7 @@ def test_openai_connection():
             api_version=api_version
         )
         
-        print_info("Sending test request...")
+        print_info("Sending test request...", buf)
         
         response = client.chat.completions.create(
             model=deployment,
@@ -162,22 +185,22 @@ def test_openai_connection():
         )
         
         result = response.choices[0].message.content
-        print_success(f"Connection successful! Model responded: {result}")
-        print_info(f"  Tokens used: {response.usage.total_tokens}")
+        print_success(f"Connection successful! Model responded: {result}", buf)
+        print_info(f"  Tokens used: {response.usage.total_tokens}", buf)
         return True
         
     except ImportError:
-        print_warning("OpenAI library not installed. Run: pip install -r requirements.txt")
+        print_warning("OpenAI library not installed. Run: pip install -r requirements.txt", buf)
         return False
     except Exception as e:
-        print_error(f"Connection failed: {str(e)}")
+        print_error(f"Connection failed: {str(e)}", buf)
         return False
 
-def check_folders():
+def check_folders(buf=None):
     """Check if required folders exist."""
-    print_header("STEP 5: Checking Project Structure")
+    print_header("STEP 5: Checking Project Structure", buf)
     
-    base_path = Path(__file__).parent.parent
+    base_path = _PROJECT_ROOT
     required_folders = {
         'data': 'Data files',
         'evaluation': 'Evaluation datasets',
@@ -190,9 +213,9 @@ def check_folders():
     for folder, description in required_folders.items():
         folder_path = base_path / folder
         if folder_path.exists():
-            print_success(f"{description} folder exists: {folder}/")
+            print_success(f"{description} folder exists: {folder}/", buf)
         else:
-            print_warning(f"{description} folder missing: {folder}/")
+            print_warning(f"{description} folder missing: {folder}/", buf)
             all_exist = False
     
     return all_exist
@@ -240,6 +263,16 @@ def display_next_steps():
         for line in step[1:]:
             print(f"  {line}")
 
+def run_check(name, check_func):
+    """Run one check, buffering its output; returns (result, output text)."""
+    buf = io.StringIO()
+    try:
+        result = check_func(buf)
+    except Exception as e:
+        print_error(f"Error during {name} check: {str(e)}", buf)
+        result = False
+    return result, buf.getvalue()
+
 def main():
     """Main verification function."""
     print(f"\n{BLUE}╔{'═' * 78}╗{RESET}")
@@ -256,14 +289,15 @@ def main():
         ("OpenAI Connection", test_openai_connection)
     ]
     
+    # The checks are independent: run them at once, so the total time is that of the slowest
+    # (the OpenAI round-trip), and write each one's buffered output in order as it becomes available
     results = []
-    for name, check_func in checks:
-        try:
-            result = check_func()
+    with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+        futures = [executor.submit(run_check, name, check_func) for name, check_func in checks]
+        for (name, _), future in zip(checks, futures):
+            result, output = future.result()
+            sys.stdout.write(output)
             results.append((name, result))
-        except Exception as e:
-            print_error(f"Error during {name} check: {str(e)}")
-            results.append((name, False))
     
     # Summary
     print_header("VERIFICATION SUMMARY")